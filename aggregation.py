@@ -0,0 +1,59 @@
+import numpy as np
+
+from timeparse import MISSING_TIME, SECONDS_PER_DAY
+
+
+# Function to turn join/leave seconds-of-day into [start, end) spans in
+# seconds; a leave time earlier than the join time means the session ran
+# past midnight. Returns starts, ends and a mask of rows with both times.
+def session_spans(join_seconds, leave_seconds):
+    starts = np.asarray(join_seconds, dtype=np.int32)
+    leave_seconds = np.asarray(leave_seconds, dtype=np.int32)
+    valid = (starts != MISSING_TIME) & (leave_seconds != MISSING_TIME)
+    lengths = leave_seconds - starts
+    lengths = np.where(lengths < 0, lengths + SECONDS_PER_DAY, lengths)
+    return starts, starts + lengths, valid
+
+
+# Function to merge overlapping or touching spans within each group.
+# groups are non-negative integer codes; returns the merged spans as
+# (groups, starts, ends), sorted by group and start.
+def merge_intervals(groups, starts, ends):
+    groups = np.asarray(groups, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if not len(groups):
+        return groups, starts, ends
+
+    # Shift every group onto its own stretch of the number line: one sort
+    # key orders by group then start, and one running maximum covers all
+    # groups without resetting between them
+    width = max(int(ends.max()), int(starts.max())) + 1
+    offset = groups * width
+    order = np.argsort(offset + starts)
+    groups, starts, ends, offset = groups[order], starts[order], ends[order], offset[order]
+    shifted_ends = np.maximum.accumulate(ends + offset)
+
+    # A span opens a new merged span when it starts after everything before it ended
+    opens = np.ones(len(groups), dtype=bool)
+    opens[1:] = starts[1:] + offset[1:] > shifted_ends[:-1]
+    first = np.flatnonzero(opens)
+    last = np.append(first[1:], len(groups)) - 1
+    return groups[first], starts[first], shifted_ends[last] - offset[first]
+
+
+# Function to total the time covered by each group's spans, counting
+# overlapping re-joins once. Returns one total per group code.
+def covered_seconds(groups, starts, ends, n_groups):
+    groups, starts, ends = merge_intervals(groups, starts, ends)
+    return np.bincount(groups, weights=ends - starts, minlength=n_groups)
+
+
+# Function to count values per [edge, next edge) bin in one pass;
+# NaN and out-of-range values are not counted
+def histogram(values, bin_edges):
+    values = np.asarray(values, dtype=np.float64)
+    bin_edges = np.asarray(bin_edges, dtype=np.float64)
+    bins = np.searchsorted(bin_edges, values, side='right') - 1
+    counted = (bins >= 0) & (bins < len(bin_edges) - 1) & ~np.isnan(values)
+    return np.bincount(bins[counted], minlength=len(bin_edges) - 1)
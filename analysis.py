@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import covered_seconds, histogram, session_spans
+from geolocation import lookup_states_online, resolve_states
+from instrumentation import stage
+from timeparse import MISSING_TIME, duration_minutes, extract_leave_time, parse_time_of_day
+
+RELEVANT_STATES = {
+    'Hindi Medium': ["Gujarat", "Uttar Pradesh", "Rajasthan", "Haryana", "Himachal Pradesh", "Jharkhand", "Madhya Pradesh"],
+    'English Medium': ["Telangana", "Andhra Pradesh", "Manipur", "Mizoram", "Tripura"],
+}
+
+BIN_EDGES = [0, 1, 5, 20, 40, 60, 80, float('inf')]
+BIN_LABELS = ['<1 min', '1-5 mins', '5-20 mins', '20-40 mins', '40-60 mins', '60-80 mins', '80+ mins']
+
+# Meetings located per batch when progress is reported
+GEOLOCATE_BATCH_SIZE = 5000
+
+
+# Function to pick the states reported on for a medium
+def relevant_states_for(medium):
+    if medium == 'Hindi Medium':
+        return RELEVANT_STATES['Hindi Medium']
+    return RELEVANT_STATES['English Medium']
+
+
+# Function to resolve the state of every meeting's IP.
+# Returns one row per meeting: Meeting ID, Department and a categorical State.
+def locate_meetings(data, online_lookup=True):
+    with stage('geolocate', rows_in=len(data)) as record:
+        unique_df = data[['Meeting ID', 'Department']].drop_duplicates(subset=['Meeting ID'])
+        # Offline range lookup for the whole column; ipinfo only for addresses it doesn't cover
+        fallback = lookup_states_online if online_lookup else None
+        unique_df = unique_df.assign(State=resolve_states(unique_df['Department'], fallback=fallback))
+        record['rows_out'] = len(unique_df)
+    return unique_df
+
+
+# Function to split state counts into the medium's states and everything else
+def summarize_states(state_counts, medium):
+    relevant_states = relevant_states_for(medium)
+    filtered_state_counts = state_counts[state_counts.index.isin(relevant_states)]
+    other_states_df = state_counts[~state_counts.index.isin(relevant_states)].reset_index()
+    other_states_df.columns = ['State', 'Count']
+    other_states_df = pd.concat([
+        other_states_df,
+        pd.DataFrame({'State': ['Other States'], 'Count': [other_states_df['Count'].sum()]})
+    ], ignore_index=True)
+    return filtered_state_counts, other_states_df
+
+
+# Function to compute the duration of every session row.
+# Rows are identified by their index in the original file, so chunks of a
+# larger file can be passed in as long as they keep their running index.
+# Only the columns needed downstream are kept, in a compact schema:
+# categorical IPs, int32 seconds-of-day and float32 minutes.
+def session_durations(data):
+    with stage('parse_join_times', rows_in=len(data)) as record:
+        # Join times as seconds-of-day; rows whose time doesn't parse are dropped
+        join_seconds = parse_time_of_day(data['Phone'])
+        keep = join_seconds != MISSING_TIME
+        data = data[keep]
+        record['rows_out'] = len(data)
+    with stage('extract_leave_times', rows_in=len(data)) as record:
+        # Leave times come from the VoIP text; the first three rows of the export are not sessions
+        leave_seconds = extract_leave_time(data['VoIP'])
+        leave_seconds[data.index < 3] = MISSING_TIME
+        record['rows_out'] = int((leave_seconds != MISSING_TIME).sum())
+    with stage('durations', rows_in=len(data)) as record:
+        sessions = pd.DataFrame({
+            'Department': pd.Categorical(data['Department']),
+            'Phone': join_seconds[keep],
+            'Extracted Time': leave_seconds,
+        }, index=data.index)
+        sessions['diff'] = duration_minutes(sessions['Phone'], sessions['Extracted Time'])
+        record['rows_out'] = len(sessions)
+    return sessions
+
+
+# Function to count participants per time-spent interval; bins are
+# [edge, next edge) as with pd.cut(right=False)
+def bin_time_spent(aggregated_data, bin_edges=BIN_EDGES, bin_labels=BIN_LABELS):
+    with stage('binning', rows_in=len(aggregated_data)) as record:
+        counts = histogram(aggregated_data['Total Time Spend'], bin_edges)
+        index = pd.CategoricalIndex(bin_labels, categories=bin_labels, ordered=True, name='Total Time Spend')
+        time_interval_counts = pd.Series(counts, index=index, name='count')
+        record['rows_out'] = len(time_interval_counts)
+    return time_interval_counts
+
+
+# Function to count meetings per state, most common first
+def count_states(data, online_lookup=True):
+    return category_counts(locate_meetings(data, online_lookup)['State'])
+
+
+# Function to count meetings per state a batch of meetings at a time.
+# Yields (meetings located, total meetings, running state counts) after
+# each batch; the final counts are the same as count_states'.
+def iter_state_counts(data, online_lookup=True, batch_size=GEOLOCATE_BATCH_SIZE):
+    meetings = data[['Meeting ID', 'Department']].drop_duplicates(subset=['Meeting ID'])
+    state_counts = pd.Series(dtype='int64')
+    yield 0, len(meetings), state_counts
+    for start in range(0, len(meetings), batch_size):
+        batch = locate_meetings(meetings.iloc[start:start + batch_size], online_lookup)
+        state_counts = state_counts.add(category_counts(batch['State']), fill_value=0).astype('int64')
+        state_counts = state_counts.sort_values(ascending=False, kind='stable')
+        yield start + len(batch), len(meetings), state_counts
+
+
+# Function to count the values of a categorical column straight from its
+# codes; categories that don't occur are left out
+def category_counts(column):
+    codes = column.cat.codes.to_numpy()
+    counts = np.bincount(codes[codes >= 0], minlength=len(column.cat.categories))
+    counts = pd.Series(counts, index=pd.Index(column.cat.categories, dtype='object'), name='count')
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+
+# Function to total the time spent per IP. Overlapping sessions of the
+# same IP (re-joins from several tabs or devices) are counted once; IPs
+# without a complete session get 0.
+def time_spent_per_ip(data):
+    if 'VoIP' not in data.columns:
+        raise ValueError("The 'VoIP' column is missing in the uploaded file.")
+    data = session_durations(data)
+    with stage('groupby', rows_in=len(data)) as record:
+        ips = data['Department'].cat.remove_unused_categories()
+        codes = ips.cat.codes.to_numpy()
+        starts, ends, valid = session_spans(data['Phone'], data['Extracted Time'])
+        valid &= codes >= 0
+        seconds = covered_seconds(codes[valid], starts[valid], ends[valid], len(ips.cat.categories))
+        aggregated_data = pd.DataFrame({
+            'Unique IP Add': pd.Categorical(ips.cat.categories),
+            'Total Time Spend': (seconds / 60).astype(np.float32),
+        })
+        record['rows_out'] = len(aggregated_data)
+    return aggregated_data
+
+
+# Function to process data.
+# Stages: durations -> geolocation -> binning -> medium filter; only the
+# last one depends on the medium, so callers can cache the others.
+def process_data(data, medium, online_lookup=True):
+    aggregated_data = time_spent_per_ip(data)
+    state_counts = count_states(data, online_lookup)
+    time_interval_counts = bin_time_spent(aggregated_data)
+    filtered_state_counts, other_states_df = summarize_states(state_counts, medium)
+    return time_interval_counts, filtered_state_counts, aggregated_data, other_states_df
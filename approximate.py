@@ -0,0 +1,221 @@
+import io
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from analysis import BIN_EDGES, BIN_LABELS, relevant_states_for, session_durations, summarize_states
+from geolocation import lookup_states_online, resolve_states
+from instrumentation import stage
+from sketches import HLL_PRECISION, FixedHistogram, HyperLogLog, hash_values
+
+# Error bounds are reported as two standard errors (about 95%)
+ERROR_STDS = 2
+
+# Most recently seen meetings whose state is remembered between chunks
+MEETING_CARRY = 100_000
+
+
+# Fixed-size, mergeable summary of one or more exports: distinct meetings
+# and distinct participant IPs per state (HyperLogLog) and the distribution
+# of session lengths (one-minute histogram). Built one chunk at a time;
+# only these sketches and the states of the last MEETING_CARRY meetings
+# are kept, whatever the size of the input. Meeting IDs are hashed with
+# salt (batch.py uses each export's path), so after merging, a meeting ID
+# that appears in several exports counts once per export, as when their
+# exact counts are added up.
+class AttendanceSketch:
+    def __init__(self, precision=HLL_PRECISION, meeting_carry=MEETING_CARRY, salt=''):
+        self.precision = precision
+        self.salt = salt
+        self.meetings = {}
+        self.participants = {}
+        self.all_meetings = HyperLogLog(precision)
+        self.all_participants = HyperLogLog(precision)
+        # Sessions by their own length: unlike a participant's total time,
+        # a session never spans chunks, so the counts are exact
+        self.time_spent = FixedHistogram()
+        self.rows = 0
+        self.chunks = 0
+        # Meeting ID -> state for recent meetings, oldest first; not merged
+        # or serialized, as meetings don't span files
+        self.meeting_carry = meeting_carry
+        self.meeting_states = {}
+        self.dropped_meetings = 0
+
+    def _state_sketch(self, sketches, state):
+        if state not in sketches:
+            sketches[state] = HyperLogLog(self.precision)
+        return sketches[state]
+
+    def _add_by_state(self, sketches, states, hashes):
+        state_codes = states.cat.codes.to_numpy()
+        for code, state in enumerate(states.cat.categories):
+            rows = state_codes == code
+            if rows.any():
+                self._state_sketch(sketches, state).add_hashes(hashes[rows])
+
+    # Function to pick the meetings of a chunk that haven't been located
+    # yet, with the first row each appears on
+    def _new_meetings(self, chunk):
+        firsts = chunk[['Meeting ID', 'Department']].drop_duplicates(subset=['Meeting ID'])
+        meeting_ids = firsts['Meeting ID'].to_numpy(dtype=object, copy=True)
+        meeting_ids[pd.isna(meeting_ids)] = None
+        known = np.fromiter((meeting in self.meeting_states for meeting in meeting_ids), dtype=bool,
+                            count=len(meeting_ids))
+        # Meetings seen again move to the back of the carry
+        for meeting in meeting_ids[known]:
+            self.meeting_states[meeting] = self.meeting_states.pop(meeting)
+        return firsts[~known], meeting_ids[~known]
+
+    def add_chunk(self, chunk, online_lookup=True):
+        self.rows += len(chunk)
+        self.chunks += 1
+        fallback = lookup_states_online if online_lookup else None
+
+        # A meeting belongs to the state of the first row it appears on, as
+        # in locate_meetings; a meeting that comes back after dropping out
+        # of the carry is located again from its first row in that chunk
+        new_meetings, meeting_ids = self._new_meetings(chunk)
+        meeting_states = resolve_states(new_meetings['Department'], fallback=fallback)
+        meeting_hashes = hash_values(new_meetings['Meeting ID'], self.salt)
+        self._add_by_state(self.meetings, meeting_states, meeting_hashes)
+        self.all_meetings.add_hashes(meeting_hashes)
+        self.meeting_states.update(zip(meeting_ids, meeting_states.astype(str)))
+        dropped = list(islice(self.meeting_states, max(0, len(self.meeting_states) - self.meeting_carry)))
+        for meeting in dropped:
+            del self.meeting_states[meeting]
+        self.dropped_meetings += len(dropped)
+
+        # A participant is an IP with a session, in the state of that IP
+        sessions = session_durations(chunk)
+        ips = pd.Series(sessions['Department'].cat.remove_unused_categories().cat.categories)
+        ip_hashes = hash_values(ips)
+        self._add_by_state(self.participants, resolve_states(ips, fallback=fallback), ip_hashes)
+        self.all_participants.add_hashes(ip_hashes)
+
+        minutes = sessions['diff'].to_numpy(dtype=np.float64)
+        self.time_spent.add(minutes[~np.isnan(minutes)])
+        return self
+
+    def merge(self, other):
+        for mine, theirs in ((self.meetings, other.meetings), (self.participants, other.participants)):
+            for state, sketch in theirs.items():
+                self._state_sketch(mine, state).merge(sketch)
+        self.all_meetings.merge(other.all_meetings)
+        self.all_participants.merge(other.all_participants)
+        self.time_spent.merge(other.time_spent)
+        self.rows += other.rows
+        self.chunks += other.chunks
+        self.dropped_meetings += other.dropped_meetings
+        return self
+
+    # Meetings counted in a second state after coming back once their state
+    # was dropped from the carry: the per-state meetings in excess of the
+    # distinct meetings, or 0 when that's within the sketches' error (or
+    # no meeting was ever dropped)
+    def relocated_meetings(self):
+        if not self.dropped_meetings:
+            return 0
+        total = self.all_meetings.count()
+        counted = np.array([sketch.count() for sketch in self.meetings.values()])
+        excess = counted.sum() - total
+        error = ERROR_STDS * self.all_meetings.relative_error * np.sqrt(np.sum(counted ** 2) + total ** 2)
+        return int(round(excess)) if excess > error else 0
+
+    # Function to estimate meetings and participants per state, most
+    # meetings first, with their error bounds
+    def state_table(self):
+        rows = []
+        for state in set(self.meetings) | set(self.participants):
+            row = {'State': state}
+            for column, sketches in (('Meetings', self.meetings), ('Participants', self.participants)):
+                sketch = sketches.get(state)
+                estimate = sketch.count() if sketch is not None else 0.0
+                row[column] = int(round(estimate))
+                row[f'{column} ±'] = int(np.ceil(ERROR_STDS * sketch.relative_error * estimate)) if sketch else 0
+            rows.append(row)
+        columns = ['State', 'Meetings', 'Meetings ±', 'Participants', 'Participants ±']
+        table = pd.DataFrame(rows, columns=columns)
+        return table.sort_values(['Meetings', 'State'], ascending=[False, True], kind='stable').set_index('State')
+
+    # Function to count sessions (not participants) per time-spent
+    # interval, binned as in bin_time_spent; also returns how many of each
+    # count are uncertain, which is only non-zero for edges that aren't
+    # whole minutes
+    def time_interval_counts(self, bin_edges=BIN_EDGES, bin_labels=BIN_LABELS):
+        counts, uncertain = self.time_spent.rebin(bin_edges)
+        index = pd.CategoricalIndex(bin_labels, categories=bin_labels, ordered=True, name='Session Length')
+        return pd.Series(counts, index=index, name='count'), pd.Series(uncertain, index=index, name='±')
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        states = sorted(set(self.meetings) | set(self.participants))
+        empty = np.zeros(1 << self.precision, dtype=np.uint8)
+        np.savez_compressed(
+            buffer,
+            precision=self.precision,
+            states=np.array(states, dtype=str),
+            meetings=np.stack([self.meetings[s].registers if s in self.meetings else empty for s in states] or [empty]),
+            participants=np.stack([self.participants[s].registers if s in self.participants else empty
+                                   for s in states] or [empty]),
+            all_meetings=self.all_meetings.registers,
+            all_participants=self.all_participants.registers,
+            time_edges=self.time_spent.edges,
+            time_counts=self.time_spent.counts,
+            totals=np.array([self.rows, self.chunks, self.dropped_meetings], dtype=np.int64),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            sketch = cls(int(arrays['precision']))
+            for i, state in enumerate(arrays['states'].tolist()):
+                sketch.meetings[state] = HyperLogLog(sketch.precision, arrays['meetings'][i].copy())
+                sketch.participants[state] = HyperLogLog(sketch.precision, arrays['participants'][i].copy())
+            sketch.all_meetings = HyperLogLog(sketch.precision, arrays['all_meetings'].copy())
+            sketch.all_participants = HyperLogLog(sketch.precision, arrays['all_participants'].copy())
+            sketch.time_spent = FixedHistogram(arrays['time_edges'], arrays['time_counts'].copy())
+            sketch.rows, sketch.chunks, sketch.dropped_meetings = (int(value) for value in arrays['totals'])
+        return sketch
+
+
+# Function to sketch an export in one pass over its chunks (see
+# streaming.iter_file_chunks); progress(rows) is called after every chunk
+def sketch_chunks(chunks, online_lookup=True, progress=None, salt=''):
+    sketch = AttendanceSketch(salt=salt)
+    with stage('sketch') as record:
+        for chunk in chunks:
+            sketch.add_chunk(chunk, online_lookup)
+            if progress is not None:
+                progress(sketch.rows)
+        record['rows_in'] = sketch.rows
+    if not sketch.rows:
+        raise ValueError("The uploaded file is empty.")
+    return sketch
+
+
+# Function to summarize a sketch like process_data: estimated time interval
+# counts, the medium's meeting counts per state and the other states
+def summarize_sketch(sketch, medium):
+    time_interval_counts, _ = sketch.time_interval_counts()
+    state_counts = sketch.state_table()['Meetings']
+    filtered_state_counts, other_states_df = summarize_states(state_counts[state_counts > 0], medium)
+    return time_interval_counts, filtered_state_counts, other_states_df
+
+
+# Function to process an export approximately, in fixed memory. Returns the
+# estimated time interval counts, filtered state counts and other states,
+# plus the sketch itself for error bounds and merging. salt sets apart the
+# meetings of this export (see AttendanceSketch).
+def process_approximate(chunks, medium, online_lookup=True, salt=''):
+    sketch = sketch_chunks(chunks, online_lookup, salt=salt)
+    time_interval_counts, filtered_state_counts, other_states_df = summarize_sketch(sketch, medium)
+    return time_interval_counts, filtered_state_counts, other_states_df, sketch
+
+
+# Function to pick the medium's rows of a sketch's state table
+def medium_state_table(sketch, medium):
+    table = sketch.state_table()
+    return table[table.index.isin(relevant_states_for(medium))]
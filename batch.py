@@ -0,0 +1,159 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from analysis import RELEVANT_STATES, process_data
+from approximate import AttendanceSketch, process_approximate
+from ingest import load_upload
+from charts import PARTICIPATION_TITLE, SESSIONS_TITLE, time_interval_chart
+from exports import EXPORT_FORMATS, export_results
+from reports import create_csv, create_pdf, time_interval_table
+from streaming import iter_file_chunks
+
+EXPORT_EXTENSIONS = ('.csv', '.xlsx')
+
+
+# Function to expand a directory or glob pattern into export files
+def find_exports(source):
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths if path.lower().endswith(EXPORT_EXTENSIONS) and os.path.isfile(path))
+
+
+def write_bytes(path, content):
+    with open(path, 'wb') as output_file:
+        output_file.write(content)
+
+
+# Function to analyse one export and write its PDF/XLSX reports.
+# Runs in a worker process; the IP lookup and ingest caches live on disk,
+# so every worker shares them.
+# With approximate=True the export is sketched chunk by chunk in fixed
+# memory, and the sketch is returned so the parent can merge them.
+# export_format also streams the per-participant and per-state results to
+# <name>_participants.<format> and <name>_states.<format>.
+def process_export(path, medium, out_dir, online_lookup=True, approximate=False, export_format=None):
+    started = time.perf_counter()
+    sketch = None
+    if approximate:
+        file_size = os.path.getsize(path)
+        with open(path, 'rb') as export_file:
+            # Salted with the path, so merged meetings add up across files like the exact counts
+            time_interval_counts, state_counts, other_states_df, sketch = process_approximate(
+                iter_file_chunks(export_file, path), medium, online_lookup, salt=path)
+        rows = sketch.rows
+        aggregated_data = pd.DataFrame({'Unique IP Add': [], 'Total Time Spend': []})
+    else:
+        with open(path, 'rb') as export_file:
+            file_bytes = export_file.read()
+        file_size = len(file_bytes)
+        data = load_upload(file_bytes, os.path.basename(path))
+        rows = len(data)
+        time_interval_counts, state_counts, aggregated_data, other_states_df = process_data(data, medium, online_lookup)
+        # Every state's meetings, without the 'Other States' total row
+        all_state_counts = pd.concat([state_counts, other_states_df.set_index('State')['Count'].drop('Other States')])
+
+    stem = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+    time_interval_counts_df = time_interval_table(time_interval_counts)
+    # Approximate mode counts sessions by their own length, not participants' total time
+    chart_title = SESSIONS_TITLE if approximate else PARTICIPATION_TITLE
+    graph_png = time_interval_chart(time_interval_counts_df, title=chart_title)
+    write_bytes(f'{stem}_graph.png', graph_png)
+    write_bytes(f'{stem}_report.pdf', create_pdf(state_counts, time_interval_counts_df, aggregated_data,
+                                                 other_states_df, graph_png))
+    write_bytes(f'{stem}_attendance.xlsx', create_csv(state_counts))
+    if export_format and not approximate:
+        # For XLSX the state table is a sheet of the participants workbook
+        states_path = f'{stem}_states.{export_format}' if export_format != 'xlsx' else None
+        export_results(aggregated_data, all_state_counts, export_format, f'{stem}_participants.{export_format}',
+                       states_path, online_lookup)
+
+    seconds = time.perf_counter() - started
+    return {
+        'File': os.path.basename(path),
+        'Rows': rows,
+        'Participants': round(sketch.all_participants.count()) if sketch else len(aggregated_data),
+        'Seconds': round(seconds, 3),
+        'Rows/s': round(rows / seconds) if seconds else 0,
+        'MB/s': round(file_size / 1e6 / seconds, 2) if seconds else 0,
+        'State Counts': state_counts.to_dict(),
+        'Sketch': sketch.to_bytes() if sketch else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate attendance reports for a batch of meeting exports.')
+    parser.add_argument('source', help='directory or glob pattern of .csv/.xlsx exports')
+    parser.add_argument('--medium', choices=sorted(RELEVANT_STATES), default='Hindi Medium')
+    parser.add_argument('--out', default='reports', help='output directory (default: reports)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    parser.add_argument('--offline', action='store_true', help='never look IPs up on ipinfo.io')
+    parser.add_argument('--approximate', action='store_true',
+                        help='estimate counts with fixed-memory sketches; also writes approximate_states.csv '
+                             'and approximate_sessions.csv')
+    parser.add_argument('--export', choices=sorted(EXPORT_FORMATS), dest='export_format',
+                        help='also export per-participant and per-state results in this format')
+    args = parser.parse_args(argv)
+
+    paths = find_exports(args.source)
+    if not paths:
+        parser.error(f'no .csv or .xlsx files found in {args.source}')
+    os.makedirs(args.out, exist_ok=True)
+
+    started = time.perf_counter()
+    summaries = []
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(process_export, path, args.medium, args.out, not args.offline, args.approximate,
+                               args.export_format): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as error:
+                failed += 1
+                print(f'{os.path.basename(path)}: failed ({error})', file=sys.stderr)
+                continue
+            summaries.append(summary)
+            print(f"{summary['File']}: {summary['Rows']} rows in {summary['Seconds']:.2f}s "
+                  f"({summary['Rows/s']} rows/s, {summary['MB/s']} MB/s)")
+
+    if summaries:
+        summaries.sort(key=lambda summary: summary['File'])
+        # Combined attendance across all files, plus one summary row per file
+        total_counts = pd.Series(dtype='int64')
+        for summary in summaries:
+            total_counts = total_counts.add(pd.Series(summary['State Counts'], dtype='int64'), fill_value=0)
+        write_bytes(os.path.join(args.out, 'attendance_summary.xlsx'), create_csv(total_counts.astype('int64')))
+
+        summary_df = pd.DataFrame([{k: v for k, v in summary.items() if k not in ('State Counts', 'Sketch')}
+                                   for summary in summaries])
+        summary_df = summary_df.join(pd.DataFrame([summary['State Counts'] for summary in summaries]).fillna(0).astype('int64'))
+        summary_df.to_csv(os.path.join(args.out, 'summary.csv'), index=False)
+
+        if args.approximate:
+            # Sketches merge into estimates for all files together, with error bounds
+            combined = AttendanceSketch()
+            for summary in summaries:
+                combined.merge(AttendanceSketch.from_bytes(summary['Sketch']))
+            combined.state_table().reset_index().to_csv(os.path.join(args.out, 'approximate_states.csv'), index=False)
+            intervals, bounds = combined.time_interval_counts()
+            pd.DataFrame({'Session Length': intervals.index.astype(str), 'Sessions': intervals.to_numpy(),
+                          'Sessions ±': bounds.to_numpy()}).to_csv(os.path.join(args.out, 'approximate_sessions.csv'),
+                                                                  index=False)
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(summary['Rows'] for summary in summaries)
+    print(f'{len(summaries)} files, {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed:.0f} rows/s), {failed} failed')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level modules that aren't part of the importable core: the Streamlit app
+NON_CORE_MODULES = {'main'}
+
+
+# Function to list the importable core: every top-level module of the
+# repository, so modules added later are covered without editing this list
+def core_modules(root=REPO_ROOT):
+    return sorted(name[:-3] for name in os.listdir(root)
+                  if name.endswith('.py') and name[:-3] not in NON_CORE_MODULES)
+
+
+CORE_MODULES = core_modules()
+
+# Libraries that should only load when a chart, PDF or online lookup is requested
+LAZY_LIBRARIES = ['matplotlib', 'fpdf', 'requests', 'streamlit', 'xlsxwriter', 'openpyxl']
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+# Function to time a cold import of one module in a fresh interpreter
+def measure_import(module, python=sys.executable):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [python, '-c', _PROBE.format(module=module, lazy=LAZY_LIBRARIES)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    process_seconds = time.perf_counter() - started
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_seconds'] = process_seconds
+    return result
+
+
+# Function to benchmark every core module, taking the median of several runs
+def run(modules=CORE_MODULES, repeat=5):
+    results = {}
+    for module in modules:
+        runs = [measure_import(module) for _ in range(repeat)]
+        results[module] = {
+            'import_seconds': statistics.median(run['seconds'] for run in runs),
+            'cold_start_seconds': statistics.median(run['process_seconds'] for run in runs),
+            'heavy_imports': runs[0]['loaded'],
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure cold import time of the analysis core.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline (default: 25%%)')
+    args = parser.parse_args(argv)
+
+    results = run(repeat=args.repeat)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['modules']
+
+    failed = False
+    print(f"{'module':<14}{'import':>10}{'cold start':>12}  heavy imports")
+    for module, result in results.items():
+        line = f"{module:<14}{result['import_seconds'] * 1000:>8.0f}ms{result['cold_start_seconds'] * 1000:>10.0f}ms  "
+        line += ', '.join(result['heavy_imports']) or '-'
+        previous = baseline.get(module)
+        if previous and result['import_seconds'] > previous['import_seconds'] * (1 + args.tolerance):
+            line += f"  REGRESSION (was {previous['import_seconds'] * 1000:.0f}ms)"
+            failed = True
+        if result['heavy_imports']:
+            failed = True
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'python': sys.version.split()[0], 'modules': results}, output_file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import geolocation  # noqa: E402
+import instrumentation  # noqa: E402
+from analysis import process_data  # noqa: E402
+from charts import _render_time_intervals, time_interval_chart  # noqa: E402
+from ingest import read_export  # noqa: E402
+from instrumentation import PerfRecorder, recording, stage  # noqa: E402
+from reports import create_csv, create_pdf, time_interval_table  # noqa: E402
+from synthetic import make_export, make_ip_ranges, make_ips  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+# Function to run the whole pipeline once on an in-memory export and
+# return the per-stage records of the run
+def run_pipeline(file_bytes, file_name, medium='Hindi Medium'):
+    recorder = PerfRecorder(run_id=file_name)
+    with recording(recorder):
+        with stage('parse', rows_in=None) as record:
+            data = read_export(file_bytes, file_name)
+            record['rows_out'] = len(data)
+        time_interval_counts, state_counts, aggregated_data, other_states_df = process_data(
+            data, medium, online_lookup=False)
+        time_interval_counts_df = time_interval_table(time_interval_counts)
+        # Charts are memoized per set of counts; clear so every run renders
+        _render_time_intervals.cache_clear()
+        graph_png = time_interval_chart(time_interval_counts_df)
+        create_pdf(state_counts, time_interval_counts_df, aggregated_data, other_states_df, graph_png)
+        create_csv(state_counts)
+    return recorder.records
+
+
+# Function to time resolve_states alone on a raw column of IP strings
+def time_resolve(ips):
+    started = time.perf_counter()
+    geolocation.resolve_states(ips)
+    return time.perf_counter() - started
+
+
+def _by_stage(records):
+    seconds = {}
+    for record in records:
+        seconds[record['stage']] = seconds.get(record['stage'], 0.0) + record['seconds']
+    return seconds
+
+
+# Function to run the pipeline and the geolocation stages once more with
+# tracemalloc on; returns each stage's peak traced allocation in MB (the
+# largest, for a stage that runs more than once), and the whole
+# pipeline's as 'pipeline'
+def trace_stages(file_bytes, file_name, export_ips, distinct_ips):
+    recorder = PerfRecorder(run_id=file_name)
+    tracemalloc.start()
+    try:
+        with recording(recorder):
+            with stage('pipeline'):
+                records = run_pipeline(file_bytes, file_name)
+            for name, ips in (('resolve_export_ips', export_ips), ('resolve_distinct_ips', distinct_ips)):
+                with stage(name):
+                    geolocation.resolve_states(ips)
+    finally:
+        tracemalloc.stop()
+    peaks = {}
+    for record in records + recorder.records:
+        peaks[record['stage']] = max(peaks.get(record['stage'], 0.0), record['peak_memory_mb'])
+    return peaks
+
+
+# Function to benchmark every stage at one input size; the median of several
+# runs, plus each stage's traced peak allocation in one extra run
+def bench_size(rows, repeat=3, file_format='csv', trace_memory=True):
+    data = make_export(rows)
+    # Geolocation on its own: the export's IP column (repeat visitors) and
+    # the worst case of every row being a different address
+    export_ips = data['Department'].astype(object)
+    distinct_ips = make_ips(rows)
+    file_name = f'synthetic_{rows}.{file_format}'
+    if file_format == 'xlsx':
+        import io
+        buffer = io.BytesIO()
+        data.to_excel(buffer, index=False)
+        file_bytes = buffer.getvalue()
+    else:
+        file_bytes = data.to_csv(index=False).encode()
+    del data
+
+    # One discarded warm-up run pays for the lazy imports and the range index load
+    run_pipeline(file_bytes, file_name)
+    runs = [_by_stage(run_pipeline(file_bytes, file_name)) for _ in range(repeat)]
+    for run in runs:
+        run['resolve_export_ips'] = time_resolve(export_ips)
+        run['resolve_distinct_ips'] = time_resolve(distinct_ips)
+    stages = {}
+    for name in runs[0]:
+        seconds = statistics.median(run[name] for run in runs)
+        stages[name] = {
+            'seconds': seconds,
+            'rows_per_second': round(rows / seconds) if seconds else None,
+        }
+
+    result = {'rows': rows, 'bytes': len(file_bytes), 'stages': stages}
+    result['total_seconds'] = sum(stage['seconds'] for stage in stages.values())
+    if trace_memory:
+        peaks = trace_stages(file_bytes, file_name, export_ips, distinct_ips)
+        result['peak_memory_mb'] = round(peaks.pop('pipeline'), 1)
+        for name, peak in peaks.items():
+            stages[name]['peak_memory_mb'] = peak
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the analysis pipeline on synthetic exports.')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='input sizes in rows (default: 10k, 100k, 1M)')
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown or peak memory growth against the baseline (default: 25%%)')
+    args = parser.parse_args(argv)
+
+    # The stage records are collected here, not logged
+    instrumentation.logger.setLevel(logging.WARNING)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = {str(result['rows']): result for result in json.load(baseline_file)['sizes']}
+
+    failed = False
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        # Offline lookups against a synthetic range table; no network, no shared caches
+        ranges_path = os.path.join(scratch, 'ip_ranges.csv')
+        make_ip_ranges().to_csv(ranges_path, index=False)
+        geolocation.IP_RANGES_PATH = ranges_path
+
+        for rows in args.rows:
+            result = bench_size(rows, args.repeat, args.format, not args.no_memory)
+            results.append(result)
+            previous = baseline.get(str(rows), {}).get('stages', {})
+
+            print(f"\n{rows} rows ({result['bytes'] / 1e6:.1f} MB), "
+                  f"{result['total_seconds']:.2f}s total, peak {result.get('peak_memory_mb', '-')} MB")
+            print(f"{'stage':<22}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}")
+            for name, timing in result['stages'].items():
+                peak = timing.get('peak_memory_mb')
+                line = (f"{name:<22}{timing['seconds']:>10.4f}{timing['rows_per_second'] or 0:>14,}"
+                        f"{peak if peak is not None else '-':>10}")
+                before = previous.get(name)
+                if before and timing['seconds'] > before['seconds'] * (1 + args.tolerance):
+                    line += f"  REGRESSION (was {before['seconds']:.4f}s)"
+                    failed = True
+                # Peaks under 1 MB are too small to compare
+                before_peak = (before or {}).get('peak_memory_mb')
+                if peak is not None and before_peak and peak > max(before_peak, 1.0) * (1 + args.tolerance):
+                    line += f"  MEMORY REGRESSION (was {before_peak} MB)"
+                    failed = True
+                print(line)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'python': sys.version.split()[0], 'format': args.format, 'sizes': results},
+                      output_file, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# States used for the synthetic IP ranges
+STATES = ["Telangana", "Andhra Pradesh", "Manipur", "Mizoram", "Tripura",
+          "Uttar Pradesh", "Gujarat", "Jharkhand", "Rajasthan",
+          "Madhya Pradesh", "Haryana", "Himachal Pradesh", "Delhi", "Karnataka"]
+
+SECONDS_PER_DAY = 24 * 3600
+_LEAVE_MESSAGES = ['Left the meeting at {}', 'Disconnected {} (network)', '{} - left']
+
+
+def _format_12h(seconds):
+    hours, minutes, secs = seconds // 3600, seconds % 3600 // 60, seconds % 60
+    return f"{(hours % 12) or 12:02d}:{minutes:02d}:{secs:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def _format_24h(seconds):
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+# Every possible time of day, formatted once; rows just index into these
+_TIMES_12H = np.array([_format_12h(s) for s in range(SECONDS_PER_DAY)], dtype=object)
+_TIMES_24H = np.array([_format_24h(s) for s in range(SECONDS_PER_DAY)], dtype=object)
+
+
+# Function to build an IP range table covering the synthetic addresses,
+# one /16 block per state
+def make_ip_ranges():
+    starts = [f'10.{i}.0.0' for i in range(len(STATES))]
+    ends = [f'10.{i}.255.255' for i in range(len(STATES))]
+    return pd.DataFrame({'start_ip': starts, 'end_ip': ends, 'region': STATES})
+
+
+# Function to generate dotted IP strings, all distinct when possible; about
+# three quarters fall inside the make_ip_ranges blocks, the rest miss
+def make_ips(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    first = np.where(rng.random(rows) < 0.75, 10, rng.integers(11, 224, size=rows))
+    second = np.where(first == 10, rng.integers(0, len(STATES), size=rows), rng.integers(0, 256, size=rows))
+    values = (first << 24) | (second << 16) | rng.integers(0, 1 << 16, size=rows)
+    values = pd.unique(values)
+    octets = [(values >> shift) & 255 for shift in (24, 16, 8, 0)]
+    dotted = octets[0].astype(str).astype(object)
+    for octet in octets[1:]:
+        dotted = dotted + '.' + octet.astype(str).astype(object)
+    return pd.Series(dotted, dtype=object)
+
+
+# Function to generate a meeting export with the schema process_data expects:
+# Meeting ID, Department (IP), Phone (join time, mixed 12h/24h) and VoIP
+# (free text with the leave time).
+def make_export(rows, participants=None, seed=0):
+    rng = np.random.default_rng(seed)
+    participants = participants or max(1, rows // 10)
+
+    octets = rng.integers(0, 256, size=(participants, 2))
+    state_blocks = rng.integers(0, len(STATES), size=participants)
+    ips = np.array([f'10.{block}.{a}.{b}' for block, (a, b) in zip(state_blocks, octets)], dtype=object)
+    participant = rng.integers(0, participants, size=rows)
+
+    join = rng.integers(8 * 3600, 20 * 3600, size=rows)
+    leave = (join + rng.gamma(2.0, 900.0, size=rows).astype(np.int64)) % SECONDS_PER_DAY
+
+    # Half of the join times are written in 12h format, half in 24h
+    twelve_hour = rng.random(rows) < 0.5
+    phone = np.where(twelve_hour, _TIMES_12H[join], _TIMES_24H[join])
+
+    leave_text = np.empty(rows, dtype=object)
+    message = rng.integers(0, len(_LEAVE_MESSAGES), size=rows)
+    for i, template in enumerate(_LEAVE_MESSAGES):
+        mask = message == i
+        prefix, suffix = template.split('{}')
+        leave_text[mask] = prefix + pd.Series(_TIMES_12H[leave[mask]], dtype=object) + suffix
+
+    return pd.DataFrame({
+        'Meeting ID': rng.integers(0, max(1, rows // 3), size=rows),
+        'Department': ips[participant],
+        'Phone': phone,
+        'VoIP': leave_text,
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic meeting export.')
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output', help='.csv or .xlsx path')
+    parser.add_argument('--participants', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = make_export(args.rows, args.participants, args.seed)
+    if args.output.lower().endswith('.xlsx'):
+        data.to_excel(args.output, index=False)
+    else:
+        data.to_csv(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import io
+from functools import lru_cache
+
+from instrumentation import stage
+
+PARTICIPATION_TITLE = 'Count of Participation in Different Time Intervals'
+# Approximate mode counts sessions rather than participants
+SESSIONS_TITLE = 'Count of Sessions in Different Time Intervals'
+
+
+def _draw_time_intervals(labels, counts, title):
+    # Explicit Agg canvas: no pyplot state, nothing registered globally
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.bar(labels, counts, color='skyblue')
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set_xlabel('Time Interval (minutes)')
+    ax.set_ylabel('Count')
+    ax.set_title(title)
+    ax.grid(axis='y')
+    fig.tight_layout()
+    return fig
+
+
+# Rendered once per distinct set of counts and format
+@lru_cache(maxsize=32)
+def _render_time_intervals(labels, counts, image_format, title):
+    fig = _draw_time_intervals(labels, counts, title)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+# Function to render the time interval distribution as PNG or SVG bytes.
+# The same bytes are shared by the app and the PDF report.
+def time_interval_chart(time_interval_counts_df, image_format='png', title=PARTICIPATION_TITLE):
+    labels = tuple(time_interval_counts_df['Time Interval'].astype(str))
+    counts = tuple(int(count) for count in time_interval_counts_df['Count'])
+    with stage('chart', rows_in=len(counts)):
+        return _render_time_intervals(labels, counts, image_format, title)
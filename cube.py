@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import histogram
+from analysis import BIN_EDGES, BIN_LABELS, RELEVANT_STATES
+from geolocation import lookup_states_online, resolve_states
+from instrumentation import stage
+
+OTHER_STATES = 'Other States'
+GROUPS = list(RELEVANT_STATES) + [OTHER_STATES]
+
+
+# Function to name the medium group a state belongs to
+def group_of(state):
+    for group, states in RELEVANT_STATES.items():
+        if state in states:
+            return group
+    return OTHER_STATES
+
+
+# Function to label [edge, next edge) bins the way BIN_LABELS does
+def bin_labels_for(bin_edges):
+    labels = []
+    for lower, upper in zip(bin_edges[:-1], bin_edges[1:]):
+        if np.isinf(upper):
+            labels.append(f'{lower:g}+ mins')
+        elif lower == 0 and upper == 1:
+            labels.append('<1 min')
+        else:
+            labels.append(f'{lower:g}-{upper:g} mins')
+    return labels
+
+
+# Pre-aggregated view of per-participant results for interactive slicing:
+# a (state x duration bucket) count cube over the standard bins, each state
+# tagged with its medium group, and the participants' time spent sorted
+# within each state so any other bins or top-N query is a few
+# searchsorted calls per state instead of a pass over the raw data.
+class AttendanceCube:
+    def __init__(self, ips, states, minutes):
+        state_codes, state_names = pd.factorize(pd.Series(states, dtype='object'), sort=True)
+        minutes = np.asarray(minutes, dtype=np.float64)
+        order = np.lexsort((minutes, state_codes))
+
+        self.states = list(state_names)
+        self.groups = [group_of(state) for state in self.states]
+        self.ips = np.asarray(ips, dtype=object)[order]
+        self.minutes = minutes[order]
+        # Participants of state i are rows offsets[i]:offsets[i + 1]
+        self.offsets = np.searchsorted(state_codes[order], np.arange(len(self.states) + 1))
+        self.counts = np.zeros((len(self.states), len(BIN_LABELS)), dtype=np.int64)
+        for i in range(len(self.states)):
+            self.counts[i] = histogram(self._slice(i), BIN_EDGES)
+
+    def _slice(self, i):
+        return self.minutes[self.offsets[i]:self.offsets[i + 1]]
+
+    # Function to pick state positions by state name and/or medium group
+    def _select(self, states=None, groups=None):
+        return [i for i, (state, group) in enumerate(zip(self.states, self.groups))
+                if (states is None or state in states) and (groups is None or group in groups)]
+
+    # Function to count the selected participants per time-spent interval.
+    # The standard bins come straight from the cube; other edges are
+    # counted from the sorted durations.
+    def histogram(self, states=None, groups=None, bin_edges=BIN_EDGES, bin_labels=None):
+        selected = self._select(states, groups)
+        bin_edges = [float(edge) for edge in bin_edges]
+        if bin_labels is None:
+            bin_labels = BIN_LABELS if bin_edges == BIN_EDGES else bin_labels_for(bin_edges)
+        if bin_edges == BIN_EDGES:
+            counts = self.counts[selected].sum(axis=0).astype(np.int64)
+        else:
+            counts = np.zeros(len(bin_edges) - 1, dtype=np.int64)
+            for i in selected:
+                counts += np.diff(np.searchsorted(self._slice(i), bin_edges, side='left'))
+        index = pd.CategoricalIndex(bin_labels, categories=bin_labels, ordered=True, name='Total Time Spend')
+        return pd.Series(counts, index=index, name='count')
+
+    # The cube itself: one row per state with its medium group, participants
+    # and total time, and its counts over the standard bins
+    def table(self, states=None, groups=None):
+        selected = self._select(states, groups)
+        table = pd.DataFrame(self.counts[selected], columns=BIN_LABELS)
+        table.insert(0, 'State', [self.states[i] for i in selected])
+        table.insert(1, 'Group', [self.groups[i] for i in selected])
+        table.insert(2, 'Participants', [int(self.offsets[i + 1] - self.offsets[i]) for i in selected])
+        table.insert(3, 'Total Minutes', [float(self._slice(i).sum()) for i in selected])
+        return table.set_index('State')
+
+    # Function to list the n selected participants who spent the most time
+    def top_participants(self, n=10, states=None, groups=None):
+        selected = self._select(states, groups)
+        # Each state's top n are the last n of its sorted slice
+        rows = np.concatenate([np.arange(max(self.offsets[i], self.offsets[i + 1] - n), self.offsets[i + 1])
+                               for i in selected] or [np.empty(0, dtype=np.intp)]).astype(np.intp)
+        state_of_row = np.searchsorted(self.offsets, rows, side='right') - 1
+        top = pd.DataFrame({
+            'Unique IP Add': self.ips[rows],
+            'State': [self.states[i] for i in state_of_row],
+            'Total Time Spend': self.minutes[rows],
+        })
+        return top.sort_values('Total Time Spend', ascending=False, kind='stable').head(n).reset_index(drop=True)
+
+
+# Function to build the cube right after aggregation: every participant's
+# IP is located (answered from the lookup caches for IPs seen before)
+def build_cube(aggregated_data, online_lookup=True):
+    with stage('cube', rows_in=len(aggregated_data)) as record:
+        fallback = lookup_states_online if online_lookup else None
+        states = resolve_states(aggregated_data['Unique IP Add'], fallback=fallback)
+        cube = AttendanceCube(aggregated_data['Unique IP Add'].astype(str), states.astype(str),
+                              aggregated_data['Total Time Spend'])
+        record['rows_out'] = len(cube.states)
+    return cube
+
+
+# Function to parse bin edges typed as '0, 1, 5, 20'; an open-ended last
+# bin is added unless the edges already end with 'inf'
+def parse_bin_edges(text):
+    try:
+        edges = [float(part) for part in text.replace(';', ',').split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"Bin edges must be numbers separated by commas, got '{text}'.")
+    if len(edges) < 1 or edges[0] < 0 or any(b <= a for a, b in zip(edges, edges[1:])):
+        raise ValueError("Bin edges must start at 0 or more and increase.")
+    if not np.isinf(edges[-1]):
+        edges.append(float('inf'))
+    if len(edges) < 2:
+        raise ValueError("At least one bin is needed.")
+    return edges
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from analysis import BIN_EDGES, BIN_LABELS
+from geolocation import lookup_states_online, resolve_states
+from instrumentation import stage
+
+# Participants are located, labelled and written this many at a time
+EXPORT_CHUNK_ROWS = 50_000
+
+# Excel's row limit, header row included; longer tables continue on
+# 'Participants 2', 'Participants 3', ...
+XLSX_MAX_ROWS = 1_048_576
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+PARTICIPANT_COLUMNS = ['Unique IP Add', 'State', 'Total Time Spend', 'Time Interval']
+STATE_COLUMNS = ['State', 'Meetings', 'Participants', 'Total Time Spend', 'Average Time Spend']
+
+
+# Function to label each duration with its [lower, upper) time interval;
+# missing or negative durations get no label
+def interval_labels(minutes, bin_edges=BIN_EDGES, bin_labels=BIN_LABELS):
+    minutes = np.asarray(minutes, dtype=np.float64)
+    codes = np.searchsorted(np.asarray(bin_edges, dtype=np.float64), minutes, side='right') - 1
+    codes[np.isnan(minutes) | (codes >= len(bin_labels))] = -1
+    return pd.Categorical.from_codes(codes, bin_labels)
+
+
+# Function to yield the per-participant table (IP, state, minutes and time
+# interval) in chunks, so no more than one chunk is located and held at once
+def participant_chunks(aggregated_data, online_lookup=True, chunksize=EXPORT_CHUNK_ROWS):
+    fallback = lookup_states_online if online_lookup else None
+    for start in range(0, len(aggregated_data), chunksize):
+        part = aggregated_data.iloc[start:start + chunksize]
+        minutes = part['Total Time Spend'].to_numpy(dtype=np.float64)
+        yield pd.DataFrame({
+            'Unique IP Add': part['Unique IP Add'].astype(str).to_numpy(dtype=object),
+            'State': resolve_states(part['Unique IP Add'], fallback=fallback).astype(str).to_numpy(dtype=object),
+            'Total Time Spend': minutes,
+            'Time Interval': interval_labels(minutes).astype(object),
+        })
+
+
+# Per-state totals gathered while the participant chunks go past
+class StateTotals:
+    def __init__(self):
+        self.participants = pd.Series(dtype='int64')
+        self.minutes = pd.Series(dtype='float64')
+
+    def add(self, chunk):
+        grouped = chunk.groupby('State', sort=False)['Total Time Spend']
+        self.participants = self.participants.add(grouped.size(), fill_value=0)
+        self.minutes = self.minutes.add(grouped.sum(), fill_value=0)
+
+    # Function to wrap a chunk iterator so every chunk is counted
+    def tally(self, chunks):
+        for chunk in chunks:
+            self.add(chunk)
+            yield chunk
+
+    # The per-state table: meetings (from state_counts), participants and
+    # their time spent, most meetings first
+    def table(self, state_counts=None):
+        if state_counts is None:
+            state_counts = pd.Series(dtype='int64')
+        states = self.participants.index.union(state_counts.index)
+        meetings = state_counts.reindex(states, fill_value=0)
+        participants = self.participants.reindex(states, fill_value=0).astype('int64')
+        minutes = self.minutes.reindex(states, fill_value=0.0)
+        table = pd.DataFrame({
+            'State': states.astype(str),
+            'Meetings': meetings.to_numpy(dtype=np.int64),
+            'Participants': participants.to_numpy(),
+            'Total Time Spend': minutes.to_numpy(),
+            'Average Time Spend': (minutes / participants.where(participants > 0)).fillna(0).to_numpy(),
+        })
+        return table.sort_values(['Meetings', 'Participants', 'State'], ascending=[False, False, True],
+                                 kind='stable').reset_index(drop=True)
+
+
+# Function to write chunks to one CSV file (a path or binary file object)
+def write_csv(chunks, target, columns=PARTICIPANT_COLUMNS):
+    rows = 0
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(target, index=False, header=header, mode='w' if header else 'a', encoding='utf-8')
+        header = False
+        rows += len(chunk)
+    if header:
+        pd.DataFrame(columns=columns).to_csv(target, index=False, encoding='utf-8')
+    return rows
+
+
+# Function to give the Parquet schema of a table's columns: counts are
+# int64, minutes float64 and everything else strings
+def parquet_schema(columns):
+    import pyarrow as pa
+
+    types = {
+        'Meetings': pa.int64(),
+        'Participants': pa.int64(),
+        'Total Time Spend': pa.float64(),
+        'Average Time Spend': pa.float64(),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+# Function to write chunks to one Parquet file, one row group per chunk.
+# Every chunk is converted with the same schema, so a chunk whose values
+# are all missing in some column doesn't change that column's type.
+def write_parquet(chunks, target, columns=PARTICIPANT_COLUMNS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = 0
+    schema = parquet_schema(columns)
+    writer = pq.ParquetWriter(target, schema)
+    try:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk[columns], schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
+
+
+# Function to write (sheet name, chunks, columns) to one workbook with
+# xlsxwriter's constant-memory mode: each row goes to a temporary file as
+# soon as it's written, so memory stays flat however long the table is
+def write_xlsx(sheets, target):
+    import xlsxwriter
+
+    rows = 0
+    workbook = xlsxwriter.Workbook(target, {'constant_memory': True, 'nan_inf_to_errors': True})
+    try:
+        for sheet_name, chunks, columns in sheets:
+            part = 1
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, columns)
+            row = 1
+            for chunk in chunks:
+                for values in zip(*(chunk[column].tolist() for column in columns)):
+                    if row == XLSX_MAX_ROWS:
+                        part += 1
+                        worksheet = workbook.add_worksheet(f'{sheet_name} {part}')
+                        worksheet.write_row(0, 0, columns)
+                        row = 1
+                    worksheet.write_row(row, 0, values)
+                    row += 1
+                rows += len(chunk)
+    finally:
+        workbook.close()
+    return rows
+
+
+# Function to export the per-participant and per-state results in fmt
+# ('csv', 'parquet' or 'xlsx'). Participants are streamed to
+# participants_target chunk by chunk; the state table goes to
+# states_target, or for 'xlsx' to a 'States' sheet of the same workbook.
+# Targets are paths or binary file objects. Returns the state table.
+def export_results(aggregated_data, state_counts, fmt, participants_target, states_target=None,
+                   online_lookup=True, chunksize=EXPORT_CHUNK_ROWS):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'; use one of {', '.join(EXPORT_FORMATS)}.")
+
+    with stage(f'{fmt}_results_export', rows_in=len(aggregated_data)) as record:
+        totals = StateTotals()
+        chunks = totals.tally(participant_chunks(aggregated_data, online_lookup, chunksize))
+        if fmt == 'xlsx':
+            # The States sheet is only built once every participant has been counted
+            def state_chunks():
+                yield totals.table(state_counts)
+            write_xlsx([('Participants', chunks, PARTICIPANT_COLUMNS),
+                        ('States', state_chunks(), STATE_COLUMNS)], participants_target)
+            states = totals.table(state_counts)
+        else:
+            writer = write_csv if fmt == 'csv' else write_parquet
+            writer(chunks, participants_target)
+            states = totals.table(state_counts)
+            if states_target is not None:
+                writer([states], states_target, STATE_COLUMNS)
+        record['rows_out'] = len(states)
+    return states
@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+GEO_CACHE_PATH = os.environ.get('GEO_CACHE_DB', 'geo_cache.sqlite3')
+GEO_CACHE_TTL = 30 * 24 * 3600        # resolved regions are kept for 30 days
+GEO_CACHE_NEGATIVE_TTL = 3600         # 'Unknown' answers are retried after an hour
+GEO_CACHE_MEMORY_SIZE = 100_000
+GEO_CACHE_MAX_ROWS = 1_000_000
+
+
+# In-flight call that other threads can wait on instead of repeating it
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Three-tier cache for IP -> state lookups:
+# in-process LRU -> SQLite on disk (TTL + size bound) -> single-flight loader
+class GeoCache:
+    def __init__(self, path=GEO_CACHE_PATH, memory_size=GEO_CACHE_MEMORY_SIZE,
+                 max_rows=GEO_CACHE_MAX_ROWS, ttl=GEO_CACHE_TTL, negative_ttl=GEO_CACHE_NEGATIVE_TTL):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory = OrderedDict()
+        self._flights = {}
+        self._lock = threading.RLock()
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'loads': 0, 'shared_loads': 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS geo ('
+                'ip TEXT PRIMARY KEY, state TEXT NOT NULL, expires_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS geo_updated ON geo (updated_at)')
+            self._db.commit()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _memory_get(self, ip):
+        with self._lock:
+            entry = self._memory.get(ip)
+            if entry is None:
+                return None
+            state, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[ip]
+                return None
+            self._memory.move_to_end(ip)
+            return state
+
+    def _memory_put(self, ip, state, expires_at):
+        with self._lock:
+            self._memory[ip] = (state, expires_at)
+            self._memory.move_to_end(ip)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _expiry(self, state):
+        return time.time() + (self.negative_ttl if state == 'Unknown' else self.ttl)
+
+    def _disk_get_many(self, ips):
+        if self._db is None or not ips:
+            return {}
+        found = {}
+        now = time.time()
+        ips = list(ips)
+        with self._db_lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(ips), 500):
+                batch = ips[start:start + 500]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._db.execute(
+                    f'SELECT ip, state, expires_at FROM geo WHERE ip IN ({placeholders}) AND expires_at > ?',
+                    (*batch, now),
+                ).fetchall()
+                for ip, state, expires_at in rows:
+                    found[ip] = (state, expires_at)
+        return found
+
+    def _disk_put_many(self, items):
+        if self._db is None or not items:
+            return
+        now = time.time()
+        with self._db_lock:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO geo (ip, state, expires_at, updated_at) VALUES (?, ?, ?, ?)',
+                [(ip, state, expires_at, now) for ip, (state, expires_at) in items.items()],
+            )
+            self._writes += len(items)
+            if self._writes >= 1000:
+                self._writes = 0
+                self._evict()
+            self._db.commit()
+
+    # Drop expired rows, then the least recently written ones above max_rows
+    def _evict(self):
+        self._db.execute('DELETE FROM geo WHERE expires_at <= ?', (time.time(),))
+        (rows,) = self._db.execute('SELECT COUNT(*) FROM geo').fetchone()
+        if rows > self.max_rows:
+            self._db.execute(
+                'DELETE FROM geo WHERE ip IN (SELECT ip FROM geo ORDER BY updated_at LIMIT ?)',
+                (rows - self.max_rows,),
+            )
+
+    # Cached states for the given IPs, without calling any loader
+    def get_many(self, ips):
+        found = {}
+        pending = []
+        for ip in ips:
+            state = self._memory_get(ip)
+            if state is None:
+                pending.append(ip)
+            else:
+                found[ip] = state
+        self._count('memory_hits', len(found))
+
+        disk = self._disk_get_many(pending)
+        for ip, (state, expires_at) in disk.items():
+            self._memory_put(ip, state, expires_at)
+            found[ip] = state
+        self._count('disk_hits', len(disk))
+        self._count('misses', len(pending) - len(disk))
+        return found
+
+    def put_many(self, states):
+        items = {ip: (state, self._expiry(state)) for ip, state in states.items()}
+        for ip, (state, expires_at) in items.items():
+            self._memory_put(ip, state, expires_at)
+        self._disk_put_many(items)
+
+    # Cached state for one IP; on a miss, loader(ip) runs once even when
+    # several sessions ask for the same IP at the same time
+    def get(self, ip, loader):
+        state = self.get_many([ip]).get(ip)
+        if state is not None:
+            return state
+        return self.load(ip, loader)
+
+    # Single-flight load for an IP already known to be missing from the cache
+    def load(self, ip, loader):
+        with self._lock:
+            # Another leader may have finished since the caller's lookup
+            state = self._memory_get(ip)
+            if state is not None:
+                return state
+            flight = self._flights.get(ip)
+            leader = flight is None
+            if leader:
+                flight = self._flights[ip] = _Flight()
+
+        if not leader:
+            self._count('shared_loads')
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            self._count('loads')
+            flight.result = loader(ip)
+            self.put_many({ip: flight.result})
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[ip]
+            flight.done.set()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+# Function to get the process-wide cache shared by all Streamlit sessions
+def get_geo_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = GeoCache()
+        return _shared_cache
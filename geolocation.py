@@ -0,0 +1,201 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from ip_resolver import get_batch_resolver
+
+# Range table with one row per IPv4 block: start_ip, end_ip, region.
+# Addresses can be dotted strings or plain integers.
+IP_RANGES_PATH = os.environ.get('IP_RANGES_DB', 'ip_ranges.csv')
+
+# Longest dotted IPv4 address ('255.255.255.255'); one more character is
+# kept so that longer strings can be told apart
+_IPV4_MAX_LENGTH = 15
+
+
+# Function to parse distinct dotted IPv4 strings without regexes. The
+# strings are laid out as a fixed-width grid of characters with one row per
+# character position, and every step works on whole rows: only digits and
+# dots, three dots between digits, at most three digits and 255 per octet.
+# The values are then read left to right, a dot shifting the octets read so
+# far up one byte (fancy indexing and reductions across a position's row
+# are several times slower).
+def _parse_dotted(addresses):
+    width = _IPV4_MAX_LENGTH + 1
+    code_points = np.asarray(addresses, dtype=f'U{width}').view(np.uint32).reshape(len(addresses), width)
+    # Only addresses that aren't ASCII need checking one by one
+    non_ascii = code_points > 127
+    valid = ~non_ascii.any(axis=1) if non_ascii.any() else np.ones(len(addresses), dtype=bool)
+    # One row per character position, so every step works on contiguous rows
+    chars = np.ascontiguousarray(code_points.astype(np.uint8).T)
+    digits = chars - np.uint8(48)
+    is_digit = digits <= 9
+    is_dot = chars == 46
+    is_end = chars == 0
+    # The last position is only filled by strings longer than an address
+    valid &= is_end[-1] & (is_digit | is_dot | is_end).all(axis=0)
+    # Nothing but padding after the end (strings can hold NULs)
+    valid &= ~(is_end[:-1] & ~is_end[1:]).any(axis=0)
+    # Three dots, each between two digits
+    valid &= (is_dot.sum(axis=0, dtype=np.uint8) == 3) & ~is_dot[0] & ~(is_dot[:-1] & ~is_digit[1:]).any(axis=0)
+
+    # Digits that follow each digit in its octet: the distance to the next
+    # dot or end, found by carrying separator positions back from the end
+    # (digits are pushed past the last position)
+    positions = np.arange(width, dtype=np.uint8)[:, None]
+    places = (is_digit.view(np.uint8) << np.uint8(4)) + positions
+    for position in range(width - 2, -1, -1):
+        np.minimum(places[position], places[position + 1], out=places[position])
+    places -= positions + np.uint8(1)
+    valid &= ~(is_digit & (places > 2)).any(axis=0)
+    # Three-digit octets above 255: over 2 hundreds, or 2 and over 55
+    hundreds = np.where(is_digit[:-2] & (places[:-2] == 2), digits[:-2], np.uint8(0))
+    valid &= ~((hundreds > 2) | ((hundreds == 2) & (digits[1:-1] * np.uint8(10) + digits[2:] > 55))).any(axis=0)
+
+    # Each digit at its place in its octet; uint8 can't overflow for
+    # octets up to 255, and the rest are invalid already
+    digits *= is_digit
+    digits *= np.uint8(1) + np.uint8(9) * (places >= 1) + np.uint8(90) * (places == 2)
+    # Read left to right: a dot moves the octets so far up one byte
+    shifts = is_dot.view(np.uint8) << np.uint8(3)
+    value = np.zeros(len(addresses), dtype=np.uint32)
+    for position in range(width):
+        value <<= shifts[position]
+        value += digits[position]
+    value *= valid
+    return value, valid
+
+
+# Function to parse strings that are already distinct (other values are
+# parsed as their str()); addresses with surrounding whitespace are parsed
+# again once stripped
+def _parse_addresses(addresses):
+    addresses = np.asarray(addresses, dtype=object)
+    values, valid = _parse_dotted(addresses)
+    retry = np.flatnonzero(~valid)
+    if len(retry):
+        stripped = pd.Series(addresses[retry], dtype='object').astype(str).str.strip().to_numpy(dtype=object)
+        changed = stripped != addresses[retry]
+        if changed.any():
+            values[retry[changed]], valid[retry[changed]] = _parse_dotted(stripped[changed])
+    return values, valid
+
+
+# Function to convert dotted IPv4 strings to uint32. Each distinct address
+# is parsed once and the results are mapped back to every row.
+def ip_to_int(ips):
+    codes, uniques = pd.factorize(pd.Series(ips, dtype='object'))
+    values, valid = _parse_addresses(uniques)
+    # Missing addresses (code -1) are invalid
+    values = np.append(values, np.uint32(0))
+    valid = np.append(valid, False)
+    return values[codes], valid[codes]
+
+
+# Function to read a column of range addresses, each dotted or a plain integer
+def _address_column(column):
+    numeric = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64)
+    plain = (numeric >= 0) & (numeric <= 0xFFFFFFFF) & (numeric == np.floor(numeric))
+    if plain.all():
+        return numeric.astype(np.uint32), plain
+    values, valid = ip_to_int(column)
+    values[plain] = numeric[plain].astype(np.uint32)
+    return values, valid | plain
+
+
+# Sorted, compact in-memory copy of the range table
+class IPRangeIndex:
+    def __init__(self, starts, ends, region_codes, regions):
+        order = np.argsort(starts, kind='stable')
+        self.starts = np.ascontiguousarray(starts[order], dtype=np.uint32)
+        self.ends = np.ascontiguousarray(ends[order], dtype=np.uint32)
+        self.region_codes = np.ascontiguousarray(region_codes[order], dtype=np.int16)
+        self.regions = np.asarray(regions, dtype=object)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_frame(cls, frame):
+        frame = frame.iloc[:, :3]
+        frame.columns = ['start_ip', 'end_ip', 'region']
+        starts, valid_starts = _address_column(frame['start_ip'])
+        ends, valid_ends = _address_column(frame['end_ip'])
+        keep = valid_starts & valid_ends & (starts <= ends)
+        region_codes, regions = pd.factorize(frame['region'].fillna('Unknown').astype(str))
+        return cls(starts[keep], ends[keep], region_codes[keep], regions)
+
+    @classmethod
+    def from_csv(cls, path):
+        # A parsed .npz copy next to the CSV makes later loads near-instant
+        cache_path = path + '.npz'
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            with np.load(cache_path) as arrays:
+                return cls(arrays['starts'], arrays['ends'], arrays['region_codes'], arrays['regions'])
+
+        index = cls.from_frame(pd.read_csv(path, dtype=str))
+        try:
+            np.savez(cache_path, starts=index.starts, ends=index.ends,
+                     region_codes=index.region_codes, regions=index.regions.astype(str))
+        except OSError:
+            pass
+        return index
+
+    # Returns the region for each address, or None where no range matches
+    # (distinct=True skips the de-duplication for addresses known to be distinct)
+    def lookup(self, ips, distinct=False):
+        values, valid = _parse_addresses(ips) if distinct else ip_to_int(ips)
+        pos = np.searchsorted(self.starts, values, side='right') - 1
+        safe_pos = pos.clip(0)
+        hit = valid & (pos >= 0) & (values <= self.ends[safe_pos])
+        regions = np.full(len(values), None, dtype=object)
+        if len(self.regions):
+            regions[hit] = self.regions[self.region_codes[safe_pos[hit]]]
+        return regions
+
+
+@lru_cache(maxsize=4)
+def _load_index(path, mtime):
+    return IPRangeIndex.from_csv(path)
+
+
+# Function to load the range table once per process (reloaded if the file changes)
+def load_ip_index(path=None):
+    path = path or IP_RANGES_PATH
+    if not os.path.exists(path):
+        return None
+    return _load_index(path, os.path.getmtime(path))
+
+
+# Function to look up IPs online through the shared, cached batch resolver
+def lookup_states_online(ips):
+    return get_batch_resolver().resolve_many(ips)
+
+
+# Function to resolve a whole column of IPs to a categorical column of states.
+# Every distinct address is resolved once against the offline index; the
+# optional fallback (e.g. lookup_states_online) gets the misses as one batch.
+def resolve_states(ips, index=None, fallback=None):
+    ips = pd.Series(ips)
+    # Categorical columns factorize straight from their codes
+    codes, uniques = pd.factorize(ips)
+    uniques = np.asarray(uniques, dtype=object)
+
+    if index is None:
+        index = load_ip_index()
+    if index is not None and len(index):
+        states = index.lookup(uniques, distinct=True)
+    else:
+        states = np.full(len(uniques), None, dtype=object)
+
+    misses = np.flatnonzero(pd.isna(states))
+    if len(misses) and fallback is not None:
+        states[misses] = fallback([str(ip) for ip in uniques[misses]])
+    states[pd.isna(states)] = 'Unknown'
+
+    # Only the per-address state codes are expanded to the full column
+    state_codes, state_names = pd.factorize(np.append(states, 'Unknown'))
+    resolved = np.where(codes >= 0, state_codes[codes.clip(0)], state_codes[-1])
+    return pd.Series(pd.Categorical.from_codes(resolved, state_names), index=ips.index, name='State')
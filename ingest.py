@@ -0,0 +1,105 @@
+import hashlib
+import io
+import os
+import uuid
+
+import pandas as pd
+
+from instrumentation import stage
+from schema import COLUMNS, apply_schema, detect_file_schema
+
+INGEST_CACHE_DIR = os.environ.get('INGEST_CACHE_DIR', '.ingest_cache')
+INGEST_CACHE_MAX_BYTES = int(os.environ.get('INGEST_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+# Only these columns are needed by the analysis, all read as text
+INGEST_COLUMNS = COLUMNS
+
+
+# Function to fingerprint an upload by its content
+def content_hash(file_bytes):
+    return hashlib.blake2b(file_bytes, digest_size=20).hexdigest()
+
+
+# Function to parse an export, reading only the columns the analysis needs.
+# Their roles are detected from a sample first, so a file without them
+# fails before the full parse; they come back under the internal names.
+def read_export(file_bytes, file_name):
+    mapping = detect_file_schema(file_bytes, file_name)
+    usecols = list(mapping.values())
+    dtypes = {column: str for column in usecols}
+    if file_name.lower().endswith('.xlsx'):
+        data = pd.read_excel(io.BytesIO(file_bytes), usecols=usecols, dtype=dtypes)
+    else:
+        data = pd.read_csv(io.BytesIO(file_bytes), usecols=usecols, dtype=dtypes)
+    return apply_schema(data, mapping)
+
+
+# pyarrow is imported on first use; the cache is skipped without it
+def _feather():
+    try:
+        import pyarrow.feather as feather
+    except ImportError:
+        return None
+    return feather
+
+
+def _cache_path(key):
+    return os.path.join(INGEST_CACHE_DIR, f'{key}.feather')
+
+
+# Drop the least recently used tables until the cache fits its size limit
+def _evict(max_bytes=INGEST_CACHE_MAX_BYTES):
+    entries = []
+    for entry in os.scandir(INGEST_CACHE_DIR):
+        if entry.name.endswith('.feather'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+# Function to load an uploaded export as a normalized table.
+# The first upload of some content is parsed and stored as an uncompressed
+# Feather file keyed by its hash; later uploads of the same bytes are
+# memory-mapped from there instead of being parsed again.
+def load_upload(file_bytes, file_name, key=None):
+    with stage('parse') as record:
+        data = _load_upload(file_bytes, file_name, key, record)
+        record['rows_out'] = len(data)
+    return data
+
+
+def _load_upload(file_bytes, file_name, key, record):
+    key = key or content_hash(file_bytes)
+    feather = _feather()
+    if feather is None:
+        return read_export(file_bytes, file_name)
+
+    path = _cache_path(key)
+    if os.path.exists(path):
+        try:
+            data = feather.read_table(path, memory_map=True).to_pandas()
+            os.utime(path)
+            record['ingest_cache_hit'] = True
+            return data
+        except (OSError, ValueError):
+            pass
+
+    record['ingest_cache_hit'] = False
+    data = read_export(file_bytes, file_name)
+    try:
+        os.makedirs(INGEST_CACHE_DIR, exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        feather.write_feather(data, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        _evict()
+    except OSError:
+        pass
+    return data
@@ -0,0 +1,133 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Records are written to stderr as one JSON object per line
+logger = logging.getLogger('data_analyser.perf')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Set PERF_LOG=1 to record every run; PERF_LOG_FILE also appends the records as JSON lines
+PERF_LOG = os.environ.get('PERF_LOG', '') not in ('', '0')
+PERF_LOG_FILE = os.environ.get('PERF_LOG_FILE')
+
+_recorder = contextvars.ContextVar('perf_recorder', default=None)
+
+# Highest traced allocation seen in each open stage of this thread,
+# innermost last; shared by every recorder, as the traced peak is
+# process-wide
+_open_stages = threading.local()
+
+
+def _stage_peaks():
+    if not hasattr(_open_stages, 'peaks'):
+        _open_stages.peaks = []
+    return _open_stages.peaks
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Counters of the shared IP cache and resolver, if they have been created
+def _lookup_counters():
+    import geo_cache
+    import ip_resolver
+
+    counters = {}
+    if geo_cache._shared_cache is not None:
+        stats = geo_cache._shared_cache.snapshot()
+        counters['cache_hits'] = stats['memory_hits'] + stats['disk_hits']
+        counters['cache_misses'] = stats['misses']
+    if ip_resolver._shared_resolver is not None:
+        stats = dict(ip_resolver._shared_resolver.stats)
+        counters['external_calls'] = stats['requests']
+        counters['external_seconds'] = stats['request_seconds']
+    return counters
+
+
+# Collects one record per instrumented stage of a run. While tracemalloc
+# is tracing, each record also gets the stage's peak traced allocation
+# above what was allocated when it started.
+class PerfRecorder:
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        counters_before = _lookup_counters()
+        rss_before = _rss_bytes()
+        # tracemalloc.reset_peak is new in Python 3.9
+        tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, 'reset_peak')
+        if tracing:
+            peaks = _stage_peaks()
+            traced_before, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage, so the enclosing one keeps its own
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            tracemalloc.reset_peak()
+            peaks.append(traced_before)
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - started, 6)
+            if tracing:
+                peak = max(peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                record['peak_memory_mb'] = round((peak - traced_before) / 1024 ** 2, 2)
+            rss_after = _rss_bytes()
+            if rss_before is not None and rss_after is not None:
+                record['memory_delta_mb'] = round((rss_after - rss_before) / 1024 ** 2, 2)
+            counters_after = _lookup_counters()
+            for key, value in counters_after.items():
+                delta = value - counters_before.get(key, 0)
+                record[key] = round(delta, 6) if isinstance(delta, float) else delta
+            if record.get('external_calls'):
+                record['external_mean_ms'] = round(record['external_seconds'] / record['external_calls'] * 1000, 2)
+            self.records.append(record)
+            self._emit(record)
+
+    def _emit(self, record):
+        line = json.dumps({'run': self.run_id, **record})
+        logger.info(line)
+        if PERF_LOG_FILE:
+            with open(PERF_LOG_FILE, 'a') as log_file:
+                log_file.write(line + '\n')
+
+
+# Function to make a recorder active for the code in the with-block
+@contextmanager
+def recording(recorder):
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+# Function to time a stage of the active run; a no-op when nothing is recording
+@contextmanager
+def stage(name, rows_in=None):
+    recorder = _recorder.get()
+    if recorder is None:
+        yield {}
+        return
+    with recorder.stage(name, rows_in) as record:
+        yield record
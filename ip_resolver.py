@@ -0,0 +1,182 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from geo_cache import get_geo_cache
+
+IPINFO_URL = os.environ.get('IPINFO_URL', 'https://ipinfo.io')
+IPINFO_API_KEY = os.environ.get('IPINFO_TOKEN', '7837dcaf59814e')  # Replace with your actual IPInfo API key
+IPINFO_RATE_LIMIT = float(os.environ.get('IPINFO_RATE_LIMIT', '20'))  # requests per second
+
+
+class LookupFailed(Exception):
+    pass
+
+
+# Token bucket shared by all worker threads
+class RateLimiter:
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Stops calling the API after repeated failures, then lets one probe
+# through once reset_timeout has passed
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+# Resolves many IPs concurrently over one pooled HTTP session
+class BatchResolver:
+    def __init__(self, base_url=IPINFO_URL, api_key=IPINFO_API_KEY, max_workers=8,
+                 rate_limit=IPINFO_RATE_LIMIT, timeout=5.0, max_retries=3, backoff=0.5,
+                 breaker=None, cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.limiter = RateLimiter(rate_limit)
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'short_circuited': 0, 'request_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+        # requests is only imported once an online lookup is actually needed
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._request_error = requests.RequestException
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    # One lookup with retries; raises LookupFailed instead of returning a guess
+    def fetch(self, ip_address):
+        url = f"{self.base_url}/{ip_address}/json"
+        params = {'token': self.api_key} if self.api_key else None
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self._count('short_circuited')
+                raise LookupFailed('circuit open')
+            if attempt:
+                self._count('retries')
+                time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random()))
+
+            self.limiter.acquire()
+            self._count('requests')
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except self._request_error:
+                self.breaker.record_failure()
+                continue
+            finally:
+                self._count('request_seconds', time.perf_counter() - started)
+
+            if response.status_code == 429 or response.status_code >= 500:
+                self.breaker.record_failure()
+                continue
+            self.breaker.record_success()
+            if response.status_code == 200:
+                try:
+                    return response.json().get('region') or 'Unknown'
+                except ValueError:
+                    return 'Unknown'
+            return 'Unknown'
+
+        self._count('failures')
+        raise LookupFailed(f'no answer for {ip_address}')
+
+    def _resolve_one(self, ip_address):
+        try:
+            if self.cache is not None:
+                return self.cache.load(ip_address, self.fetch)
+            return self.fetch(ip_address)
+        except LookupFailed:
+            return 'Unknown'
+
+    # Function to resolve a list of IPs; returns states in the same order
+    def resolve_many(self, ips):
+        ips = list(ips)
+        unique_ips = list(dict.fromkeys(ips))
+        states = self.cache.get_many(unique_ips) if self.cache is not None else {}
+        pending = [ip for ip in unique_ips if ip not in states]
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending))) as pool:
+                states.update(zip(pending, pool.map(self._resolve_one, pending)))
+        return [states[ip] for ip in ips]
+
+    def close(self):
+        self.session.close()
+
+
+_shared_resolver = None
+_shared_resolver_lock = threading.Lock()
+
+
+# Function to get the process-wide resolver (shares the geolocation cache)
+def get_batch_resolver():
+    global _shared_resolver
+    with _shared_resolver_lock:
+        if _shared_resolver is None:
+            _shared_resolver = BatchResolver(cache=get_geo_cache())
+        return _shared_resolver
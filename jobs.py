@@ -0,0 +1,132 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import recording
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_HISTORY = 16                      # finished jobs kept so a refresh can reattach to them
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# A unit of work running on the job pool. The work function reports
+# progress and partial results through update() and calls check_cancelled()
+# between steps; readers take a consistent copy with snapshot().
+class Job:
+    def __init__(self, key, recorder=None):
+        self.key = key
+        self.recorder = recorder
+        self.status = 'queued'
+        self.progress = 0.0
+        self.message = 'Waiting for a worker...'
+        self.results = {}
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    def update(self, progress=None, message=None, **results):
+        with self._lock:
+            if progress is not None:
+                self.progress = min(max(progress, 0.0), 1.0)
+            if message is not None:
+                self.message = message
+            self.results.update(results)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'results': dict(self.results),
+                'error': self.error,
+            }
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def _finish(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+
+
+# Runs jobs on a thread pool, one job per key. Submitting a key that is
+# already running or finished returns the existing job, so a page that is
+# reloaded picks up where it left off.
+class JobManager:
+    def __init__(self, max_workers=JOB_WORKERS, history=JOB_HISTORY):
+        self.history = history
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    # Function to start fn(job, *args) under key, unless a job with that key
+    # exists; restart=True replaces a job that failed or was cancelled
+    def submit(self, key, fn, *args, recorder=None, restart=False):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (restart and job.status in ('failed', 'cancelled')):
+                return job
+            job = self._jobs[key] = Job(key, recorder)
+            self._jobs.move_to_end(key)
+            self._forget_finished()
+        # The job sees the submitting thread's context (e.g. its perf recorder)
+        context = contextvars.copy_context()
+        self._pool.submit(context.run, self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        with job._lock:
+            job.status = 'running'
+            job.started_at = time.time()
+        try:
+            job.check_cancelled()
+            with recording(job.recorder):
+                fn(job, *args)
+        except JobCancelled:
+            job._finish('cancelled')
+        except Exception as error:
+            job._finish('failed', error)
+        else:
+            job._finish('done')
+
+    # Drop the oldest finished jobs beyond the history size
+    def _forget_finished(self):
+        finished = [key for key, job in self._jobs.items() if job.finished]
+        for key in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[key]
+
+
+_shared_manager = None
+_shared_manager_lock = threading.Lock()
+
+
+# Function to get the process-wide job manager shared by all Streamlit sessions
+def get_job_manager():
+    global _shared_manager
+    with _shared_manager_lock:
+        if _shared_manager is None:
+            _shared_manager = JobManager()
+        return _shared_manager
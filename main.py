@@ -369,203 +369,369 @@
 #         csv_href = f'<a href="data:application/octet-stream;base64,{csv_base64}" download="{csv_file_path}">Download CSV Report</a>'
 #         st.markdown(csv_href, unsafe_allow_html=True)
 
-import streamlit as st
+import io
+import time
+
 import pandas as pd
-import matplotlib.pyplot as plt
-from datetime import datetime
-import re
-import requests
-from fpdf import FPDF
-import base64
-
-# Function to process data
-def process_data(data, medium):
-    def standardize_time(time_str):
-        if 'AM' in time_str or 'PM' in time_str:
-            return pd.to_datetime(time_str, format='%I:%M:%S %p', errors='coerce')
+import streamlit as st
+from approximate import medium_state_table, sketch_chunks
+from analysis import BIN_EDGES, bin_time_spent, iter_state_counts, summarize_states, time_spent_per_ip
+from charts import SESSIONS_TITLE, time_interval_chart
+from cube import GROUPS, build_cube, parse_bin_edges
+from exports import EXPORT_FORMATS, export_results
+from geo_cache import get_geo_cache
+from ingest import content_hash, load_upload
+from instrumentation import PERF_LOG, PerfRecorder, stage
+from jobs import get_job_manager
+from reports import create_csv, create_pdf, time_interval_table
+from session_store import get_session_store
+from streaming import iter_file_chunks, stream_totals
+
+# Seconds between page refreshes while a job is running
+POLL_INTERVAL = 0.5
+
+# st.rerun replaced st.experimental_rerun in newer Streamlit versions
+_rerun = getattr(st, 'rerun', None) or st.experimental_rerun
+
+# Background analysis: parse -> durations -> bins -> geolocation in batches.
+# Runs on the job pool, keyed on the upload's content hash and the settings
+# that change its results, so a reload or another session with the same
+# file reattaches to it. Partial results are published as they're ready:
+# the time interval counts first, then the state counts after every batch.
+def analysis_job(job, file_bytes, file_name, file_key, online_lookup, streaming, approximate=False):
+    def on_chunk(rows):
+        job.check_cancelled()
+        job.update(message=f"Processed {rows:,} rows...")
+
+    with stage('analysis'):
+        if approximate:
+            # Fixed-memory estimates; there is no per-participant table
+            job.update(0.05, "Sketching file in chunks...")
+            sketch = sketch_chunks(iter_file_chunks(io.BytesIO(file_bytes), file_name), online_lookup, progress=on_chunk)
+            time_interval_counts, _ = sketch.time_interval_counts()
+            state_counts = sketch.state_table()['Meetings']
+            job.update(1.0, "Done", sketch=sketch, time_interval_counts=time_interval_counts,
+                       state_counts=state_counts[state_counts > 0],
+                       aggregated_data=pd.DataFrame({'Unique IP Add': [], 'Total Time Spend': []}))
+            return
+
+        if streaming:
+            job.update(0.05, "Processing file in chunks...")
+            state_counts, aggregated_data = stream_totals(
+                iter_file_chunks(io.BytesIO(file_bytes), file_name), online_lookup, progress=on_chunk)
+            job.update(1.0, "Done", aggregated_data=aggregated_data, state_counts=state_counts,
+                       time_interval_counts=bin_time_spent(aggregated_data))
+            return
+
+        job.update(0.02, "Reading file...")
+        data = load_upload(file_bytes, file_name, key=file_key)
+        job.check_cancelled()
+        job.update(0.15, "Computing time spent...")
+        aggregated_data = time_spent_per_ip(data)
+        job.check_cancelled()
+        job.update(0.4, "Locating participants...", aggregated_data=aggregated_data,
+                   time_interval_counts=bin_time_spent(aggregated_data))
+        for located, total, state_counts in iter_state_counts(data, online_lookup):
+            job.check_cancelled()
+            job.update(0.4 + 0.55 * (located / total if total else 1), f"Located {located:,} of {total:,} meetings...",
+                       state_counts=state_counts)
+        job.update(1.0, "Done")
+
+
+# Background report generation for one set of results
+def report_job(job, state_counts, time_interval_counts_df, aggregated_data, other_states_df, graph_png, history):
+    job.update(0.1, "Building PDF report...")
+    pdf = create_pdf(state_counts, time_interval_counts_df, aggregated_data, other_states_df, graph_png)
+    job.check_cancelled()
+    job.update(0.8, "Building XLSX report...", pdf=pdf)
+    job.update(1.0, "Done", xlsx=create_csv(state_counts, **history))
+
+
+# Background build of the results cube. Every participant's IP is located,
+# which can take many online lookups, so it runs after the analysis is done
+# and only once asked for.
+def cube_job(job, aggregated_data, online_lookup):
+    job.update(0.1, f"Locating {len(aggregated_data):,} participants...")
+    job.update(1.0, "Done", cube=build_cube(aggregated_data, online_lookup))
+
+
+# Background export of the per-participant and per-state results
+def export_job(job, aggregated_data, state_counts, fmt, online_lookup):
+    job.update(0.1, f"Writing {len(aggregated_data):,} participants...")
+    participants = io.BytesIO()
+    states = io.BytesIO()
+    export_results(aggregated_data, state_counts, fmt, participants, states, online_lookup)
+    job.update(1.0, "Done", participants=participants.getvalue(), states=states.getvalue() or None)
+
+
+# Keyed on every setting that changes the state counts, so exact and
+# approximate (or streamed) results of the same upload are never mixed
+@st.cache_data(max_entries=64, show_spinner=False)
+def medium_stage(file_key, online_lookup, streaming, approximate, medium, _state_counts):
+    return summarize_states(_state_counts, medium)
+
+
+# Function to show a job's progress bar and cancel button while it runs
+def show_progress(job, snapshot, label):
+    st.progress(snapshot['progress'])
+    st.caption(f"{label}: {snapshot['message']}")
+    if st.button(f"Cancel {label.lower()}", key=f"cancel-{label}"):
+        job.cancel()
+
+
+# Function to show a failed or cancelled job; returns True if it was restarted
+def show_stopped(snapshot, label):
+    if snapshot['status'] == 'cancelled':
+        st.warning(f"{label} was cancelled.")
+    elif isinstance(snapshot['error'], ValueError):
+        st.error(str(snapshot['error']))
+    else:
+        st.exception(snapshot['error'])
+    return st.button(f"Run {label.lower()} again", key=f"restart-{label}")
+
+
+# Function to slice the results interactively. Every query runs on the
+# cube built after aggregation, never on the uploaded data.
+def explore_results(cube):
+    with st.expander("Explore results"):
+        groups = st.multiselect("Medium groups", GROUPS, default=GROUPS)
+        options = [state for state, group in zip(cube.states, cube.groups) if group in groups]
+        states = st.multiselect("States (all if none are selected)", options)
+        edges_text = st.text_input("Time interval edges in minutes",
+                                   value=', '.join(f'{edge:g}' for edge in BIN_EDGES[:-1]))
+        top_n = st.slider("Top participants", min_value=5, max_value=100, value=10)
+        try:
+            bin_edges = parse_bin_edges(edges_text)
+        except ValueError as error:
+            st.error(str(error))
+            return
+
+        states = states or None
+        counts = cube.histogram(states=states, groups=groups, bin_edges=bin_edges)
+        st.bar_chart(pd.DataFrame({'Participants': counts.to_numpy()}, index=counts.index.astype(str)))
+        st.dataframe(cube.table(states=states, groups=groups))
+        st.dataframe(cube.top_participants(top_n, states=states, groups=groups))
+
+
+# Function to let an analysed upload be saved as a session of a programme;
+# returns the stored session, or None while it hasn't been saved
+def session_history(file_key, medium, state_counts, aggregated_data):
+    store = get_session_store()
+    session = store.get_session(file_key)
+    with st.expander("Programme history", expanded=session is not None):
+        if session is None:
+            programme = st.text_input("Programme")
+            session_name = st.text_input("Session name")
+            session_date = st.date_input("Session date")
+            if st.button("Add this session to the programme"):
+                session = store.add_session(file_key, state_counts, aggregated_data, session_date,
+                                            programme=programme, medium=medium, session_name=session_name)
+        if session is not None:
+            st.write(f"Saved as session {session['session_no']} of "
+                     f"'{session['programme'] or 'unnamed programme'}' ({session['date']}, week {session['week']})")
+            st.dataframe(store.sessions(session['programme']))
+            st.dataframe(store.weekly_attendance(session['programme']))
+    return session
+
+
+# Function to offer the PDF and XLSX reports; they are built in the
+# background when asked for and kept until the file or settings change.
+# Returns the report job, if any.
+def show_reports(report_key, state_counts, time_interval_counts_df, aggregated_data, other_states_df, graph_png,
+                 session, recorder):
+    manager = get_job_manager()
+    job = manager.get(report_key)
+    restart = False
+    if job is not None and job.status in ('failed', 'cancelled'):
+        restart = show_stopped(job.snapshot(), "Report generation")
+        if not restart:
+            return job
+    if job is None or restart:
+        if not restart and not st.button("Generate PDF and XLSX reports"):
+            return None
+        # Saved sessions also get the programme's weekly and cumulative attendance
+        history = {}
+        if session is not None:
+            store = get_session_store()
+            history = {
+                'session': session,
+                'cumulative': store.cumulative_attendance(session['programme']),
+                'weekly': store.weekly_attendance(session['programme']),
+            }
+        job = manager.submit(report_key, report_job, state_counts, time_interval_counts_df, aggregated_data,
+                             other_states_df, graph_png, history, recorder=recorder, restart=restart)
+
+    snapshot = job.snapshot()
+    if snapshot['status'] == 'done':
+        reports = snapshot['results']
+        st.download_button("Download PDF Report", reports['pdf'],
+                           file_name="data_analysis_report.pdf", mime="application/pdf")
+        st.download_button("Download XLSX Report", reports['xlsx'], file_name="attendance_report.xlsx",
+                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    elif not job.finished:
+        show_progress(job, snapshot, "Report generation")
+    return job
+
+
+# Function to offer the results explorer; its cube is built in the
+# background when asked for. Returns the cube job, if any.
+def show_explorer(cube_key, aggregated_data, online_lookup, recorder):
+    manager = get_job_manager()
+    job = manager.get(cube_key)
+    restart = False
+    if job is not None and job.status in ('failed', 'cancelled'):
+        restart = show_stopped(job.snapshot(), "Explorer")
+        if not restart:
+            return job
+    if job is None or restart:
+        if not restart and not st.button("Explore results"):
+            return None
+        job = manager.submit(cube_key, cube_job, aggregated_data, online_lookup, recorder=recorder, restart=restart)
+
+    snapshot = job.snapshot()
+    if snapshot['status'] == 'done':
+        explore_results(snapshot['results']['cube'])
+    elif not job.finished:
+        show_progress(job, snapshot, "Explorer")
+    return job
+
+
+# Function to offer the full per-participant and per-state results as CSV,
+# Parquet or XLSX; returns the export job, if any
+def show_exports(export_key, aggregated_data, state_counts, online_lookup, recorder):
+    manager = get_job_manager()
+    fmt = st.selectbox("Participant results format", list(EXPORT_FORMATS))
+    export_key = export_key + (fmt,)
+    job = manager.get(export_key)
+    restart = False
+    if job is not None and job.status in ('failed', 'cancelled'):
+        restart = show_stopped(job.snapshot(), "Export")
+        if not restart:
+            return job
+    if job is None or restart:
+        if not restart and not st.button("Export participant results"):
+            return None
+        job = manager.submit(export_key, export_job, aggregated_data, state_counts, fmt, online_lookup,
+                             recorder=recorder, restart=restart)
+
+    snapshot = job.snapshot()
+    if snapshot['status'] == 'done':
+        exported = snapshot['results']
+        st.download_button(f"Download participant results ({fmt.upper()})", exported['participants'],
+                           file_name=f"participants.{fmt}", mime=EXPORT_FORMATS[fmt])
+        if exported['states'] is not None:
+            st.download_button(f"Download state results ({fmt.upper()})", exported['states'],
+                               file_name=f"states.{fmt}", mime=EXPORT_FORMATS[fmt])
+    elif not job.finished:
+        show_progress(job, snapshot, "Export")
+    return job
+
+
+# Function to run the analysis of an upload in the background and show its
+# results as they arrive; returns the jobs it used
+def show_analysis(uploaded_file, medium, online_lookup, streaming, record_perf=False, approximate=False):
+    file_bytes = uploaded_file.getvalue()
+    file_key = content_hash(file_bytes)
+    manager = get_job_manager()
+
+    analysis_key = ('analysis', file_key, online_lookup, streaming, approximate)
+    job = manager.get(analysis_key)
+    restart = job is not None and job.status in ('failed', 'cancelled') and show_stopped(job.snapshot(), "Analysis")
+    if job is None or restart:
+        recorder = PerfRecorder(run_id=uploaded_file.name) if record_perf else None
+        job = manager.submit(analysis_key, analysis_job, file_bytes, uploaded_file.name, file_key, online_lookup,
+                             streaming, approximate, recorder=recorder, restart=restart)
+    jobs = [job]
+
+    snapshot = job.snapshot()
+    results = snapshot['results']
+    if not job.finished:
+        show_progress(job, snapshot, "Analysis")
+
+    cache_stats = get_geo_cache().snapshot()
+    st.caption(f"IP lookup cache: {cache_stats['memory_hits']} memory hits, {cache_stats['disk_hits']} disk hits, "
+               f"{cache_stats['misses']} misses, {cache_stats['loads']} online lookups ({cache_stats['hit_rate']:.0%} hit rate)")
+
+    if 'time_interval_counts' in results:
+        # Plotting the graph (rendered once per distinct set of counts)
+        time_interval_counts_df = time_interval_table(results['time_interval_counts'])
+        if 'sketch' in results:
+            # Approximate mode counts sessions by their own length, not participants' total time
+            graph_png = time_interval_chart(time_interval_counts_df, title=SESSIONS_TITLE)
+            st.image(graph_png, caption='Session Length Distribution')
+            st.caption("Approximate mode counts sessions rather than participants: someone who joined "
+                       "twice is counted once per session, by the length of each.")
         else:
-            return pd.to_datetime(time_str, format='%H:%M:%S', errors='coerce')
-
-    def get_state_from_ip(ip_address, api_key):
-        url = f"https://ipinfo.io/{ip_address}/json?token={api_key}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('region', 'Unknown')
+            graph_png = time_interval_chart(time_interval_counts_df)
+            st.image(graph_png, caption='Time Interval Distribution')
+
+    if 'state_counts' in results:
+        state_counts, other_states_df = summarize_states(results['state_counts'], medium)
+        if snapshot['status'] == 'done':
+            state_counts, other_states_df = medium_stage(file_key, online_lookup, streaming, approximate, medium,
+                                                         results['state_counts'])
+        if 'sketch' in results:
+            # Estimates with ~95% error bounds
+            st.dataframe(medium_state_table(results['sketch'], medium))
+            relocated = results['sketch'].relocated_meetings()
+            if relocated:
+                st.caption(f"About {relocated:,} meetings came back after too many others to remember their "
+                           f"state, and may also be counted in a second state.")
         else:
-            return 'Unknown'
-
-    api_key = '7837dcaf59814e'  # Replace with your actual IPInfo API key
-    unique_df = data.drop_duplicates(subset=['Meeting ID'])
-    print(unique_df['Department'])
-    unique_df['State'] = unique_df['Department'].apply(lambda ip: get_state_from_ip(ip, api_key))
-    state_counts = unique_df['State'].value_counts()
+            st.dataframe(state_counts.rename('Meetings'))
+
+    if snapshot['status'] == 'done':
+        aggregated_data = results['aggregated_data']
+        if not approximate:
+            explorer_job = show_explorer(('cube', file_key, streaming, online_lookup), aggregated_data,
+                                         online_lookup, job.recorder)
+            if explorer_job is not None:
+                jobs.append(explorer_job)
+        session = None
+        if not approximate:
+            # Sessions keep every state's counts, whichever medium is selected
+            session = session_history(file_key, medium, results['state_counts'], aggregated_data)
+        # A session's reports include its programme's history, so they are
+        # rebuilt once another session is added to the programme
+        history_revision = get_session_store().revision(session['programme']) if session is not None else None
+        report_key = ('reports', file_key, streaming, approximate, online_lookup, medium, history_revision)
+        reports_job = show_reports(report_key, state_counts, time_interval_counts_df, aggregated_data,
+                                  other_states_df, graph_png, session, job.recorder)
+        if reports_job is not None:
+            jobs.append(reports_job)
+        if not approximate:
+            export_key = ('export', file_key, streaming, online_lookup)
+            exports_job = show_exports(export_key, aggregated_data, results['state_counts'], online_lookup,
+                                       job.recorder)
+            if exports_job is not None:
+                jobs.append(exports_job)
+    return jobs
 
-    # Filter states based on medium
-    if medium == 'Hindi Medium':
-        relevant_states = ["Gujarat", "Uttar Pradesh", "Rajasthan", "Haryana", "Himachal Pradesh", "Jharkhand", "Madhya Pradesh"]
-    else:
-        relevant_states = ["Telangana", "Andhra Pradesh", "Manipur", "Mizoram", "Tripura"]
-
-    filtered_state_counts = state_counts[state_counts.index.isin(relevant_states)]
-    other_states_df = state_counts[~state_counts.index.isin(relevant_states)].reset_index()
-    other_states_df.columns = ['State', 'Count']
-    other_states_df = pd.concat([
-        other_states_df,
-        pd.DataFrame({'State': ['Other States'], 'Count': [other_states_df['Count'].sum()]})
-    ], ignore_index=True)
-
-    data['Phone'] = data['Phone'].apply(lambda x: standardize_time(str(x)))
-    data = data.dropna(subset=['Phone'])
-    data['Phone'] = data['Phone'].dt.strftime('%I:%M:%S').str.lstrip('0')
-    if 'VoIP' in data.columns:
-        def extract_time(text):
-            if isinstance(text, str):
-                time_match = re.search(r'\d{2}:\d{2}:\d{2} [APM]{2}', text)
-                if time_match:
-                    return time_match.group(0)
-            return None
 
-        data['VoIP'] = data['VoIP'].astype(str)
-        sliced_data = data.loc[3:].copy()
-        sliced_data['Extracted Time'] = sliced_data['VoIP'].apply(extract_time)
-        data.loc[3:, 'Extracted Time'] = sliced_data['Extracted Time'].values
-
-        def remove_am_pm(time_str):
-            if isinstance(time_str, str):
-                return time_str.split()[0]
-            return time_str
-
-        data['Extracted Time'] = data['Extracted Time'].apply(remove_am_pm)
-        data['Phone'] = data['Phone'].apply(remove_am_pm)
-        data['Phone'] = pd.to_datetime(data['Phone'], format='%H:%M:%S', errors='coerce').dt.time
-        data['Extracted Time'] = pd.to_datetime(data['Extracted Time'], format='%H:%M:%S', errors='coerce').dt.time
-
-        def time_difference(row):
-            time_format = '%H:%M:%S'
-            try:
-                Phone_time = datetime.strptime(str(row['Phone']), time_format)
-                extracted_time = datetime.strptime(str(row['Extracted Time']), time_format)
-                time_diff = extracted_time - Phone_time
-                return time_diff.total_seconds() / 60.0
-            except:
-                return None
-
-        data['diff'] = data.apply(time_difference, axis=1)
-        data = data.iloc[0:].reset_index(drop=True)
-        data['diff'] = pd.to_numeric(data['diff'], errors='coerce')
-
-        aggregated_data = data.groupby('Department', as_index=False).agg({'diff': 'sum'})
-        aggregated_data.columns = ['Unique IP Add', 'Total Time Spend']
-
-        data['Unique IP'] = aggregated_data['Unique IP Add']
-        data['Total Time Spend'] = aggregated_data['Total Time Spend']
-        bin_edges = [0, 1, 5, 20, 40, 60, 80, float('inf')]
-        bin_labels = ['<1 min', '1-5 mins', '5-20 mins', '20-40 mins', '40-60 mins', '60-80 mins', '80+ mins']
-
-        data['Time Interval'] = pd.cut(data['Total Time Spend'], bins=bin_edges, labels=bin_labels, right=False)
-        time_interval_counts = data['Time Interval'].value_counts().sort_index()
-        return time_interval_counts, filtered_state_counts, aggregated_data, other_states_df
-    else:
-        st.error("The 'VoIP' column is missing in the uploaded file.")
-        return None, None, None, None
+# Streamlit app
+def main():
+    st.title('Data Analysis and Report Generation')
 
+    medium = st.selectbox("Select Medium", ["Hindi Medium", "English Medium"])
+    online_lookup = st.checkbox("Look up IPs missing from the offline database on ipinfo.io", value=True)
 
-# Function to create PDF
-def create_pdf(state_counts, time_interval_counts_df, aggregated_data_df, other_states_df):
-    pdf = FPDF()
-    pdf.add_page()
-    
-    pdf.set_font("Arial", size=12)
-    
-    pdf.cell(200, 10, txt="Data Analysis Report", ln=True, align='C')
-    
-    pdf.ln(10)
-    pdf.cell(200, 10, txt="State Counts", ln=True)
-    for state, count in state_counts.items():
-        pdf.cell(200, 10, txt=f"{state}: {count}", ln=True)
-    
-    pdf.ln(10)
-    pdf.cell(200, 10, txt="Other States", ln=True)
-    for index, row in other_states_df.iterrows():
-        pdf.cell(200, 10, txt=f"{row['State']}: {row['Count']}", ln=True)
-    
-    pdf.ln(10)
-    pdf.cell(200, 10, txt="Time Interval Counts", ln=True)
-    for index, row in time_interval_counts_df.iterrows():
-        pdf.cell(200, 10, txt=f"{row['Time Interval']}: {row['Count']}", ln=True)
-    
-    pdf.add_page()
-    pdf.image('graph.png', 50, 50, 110)
-    
-    pdf_file_path = "data_analysis_report.pdf"
-    pdf.output(pdf_file_path)
-    return pdf_file_path
-
-# Function to create CSV file
-def create_csv(state_counts):
-    # Define the order of states
-    state_order = [
-        "Telangana", "Andhra Pradesh", "Manipur", "Mizoram", "Tripura",
-        "Uttar Pradesh", "Gujarat", "Jharkhand", "Rajasthan", 
-        "Madhya Pradesh", "Haryana", "Himachal Pradesh"
-    ]
-
-    # Create the DataFrame
-    csv_data = pd.DataFrame({
-        "State": state_order,
-        "Language": "",
-        "Week": "",
-        "Session No.": "",
-        "Session Name": "",
-        "Date": "",
-        "KGBVS who attended": [state_counts.get(state, 0) for state in state_order]  # Populate attendance counts
-    })
-
-    excel_file_path = "attendance_report.xlsx"
-    csv_data.to_excel(excel_file_path, index=False)
-    return excel_file_path
+    streaming = st.checkbox("Process large files in chunks (lower memory use)", value=False)
+    approximate = st.checkbox("Approximate mode for very large files (estimates with error bounds)", value=False)
+    record_perf = st.checkbox("Record performance", value=PERF_LOG)
 
-# Streamlit app
-st.title('Data Analysis and Report Generation')
+    uploaded_file = st.file_uploader("Upload data file", type=["xlsx", "csv"])
 
-medium = st.selectbox("Select Medium", ["Hindi Medium", "English Medium"])
+    if uploaded_file:
+        jobs = show_analysis(uploaded_file, medium, online_lookup, streaming, record_perf, approximate)
+        recorders = {id(job.recorder): job.recorder for job in jobs if job.recorder is not None}
+        if record_perf and recorders:
+            with st.expander("Performance"):
+                st.dataframe([record for recorder in recorders.values() for record in recorder.records])
+        # Keep refreshing while anything is still running
+        if any(not job.finished for job in jobs):
+            time.sleep(POLL_INTERVAL)
+            _rerun()
 
-uploaded_file = st.file_uploader("Upload data file", type=["xlsx", "csv"])
 
-if uploaded_file:
-    if uploaded_file.type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-        data = pd.read_excel(uploaded_file)
-    elif uploaded_file.type == "text/csv":
-        data = pd.read_csv(uploaded_file)
-    
-    time_interval_counts, state_counts, aggregated_data, other_states_df = process_data(data, medium)
-    
-    if time_interval_counts is not None:
-        # Plotting the graph
-        fig, ax = plt.subplots(figsize=(10, 6))
-        time_interval_counts_df = time_interval_counts.reset_index()
-        time_interval_counts_df.columns = ['Time Interval', 'Count']
-        ax.bar(time_interval_counts_df['Time Interval'].astype(str), time_interval_counts_df['Count'], color='skyblue')
-        plt.xticks(rotation=45)
-        plt.xlabel('Time Interval (minutes)')
-        plt.ylabel('Count')
-        plt.title('Count of Participation in Different Time Intervals')
-        plt.grid(axis='y')
-        plt.tight_layout()
-        plt.savefig('graph.png')
-        st.pyplot(fig)
-        
-        # Create and offer PDF for download
-        pdf_file_path = create_pdf(state_counts, time_interval_counts_df, aggregated_data, other_states_df)
-        with open(pdf_file_path, "rb") as pdf_file:
-            pdf_base64 = base64.b64encode(pdf_file.read()).decode('utf-8')
-        pdf_href = f'<a href="data:application/octet-stream;base64,{pdf_base64}" download="{pdf_file_path}">Download PDF Report</a>'
-        st.markdown(pdf_href, unsafe_allow_html=True)
-        
-        # Create and offer CSV for download
-        csv_file_path = create_csv(state_counts)
-        with open(csv_file_path, "rb") as csv_file:
-            csv_base64 = base64.b64encode(csv_file.read()).decode('utf-8')
-        csv_href = f'<a href="data:application/octet-stream;base64,{csv_base64}" download="{csv_file_path}">Download XLSX Report</a>'
-        st.markdown(csv_href, unsafe_allow_html=True)
+if __name__ == '__main__':
+    main()
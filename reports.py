@@ -0,0 +1,129 @@
+import io
+
+import pandas as pd
+
+from instrumentation import stage
+
+# Order of the states in the attendance report
+STATE_ORDER = [
+    "Telangana", "Andhra Pradesh", "Manipur", "Mizoram", "Tripura",
+    "Uttar Pradesh", "Gujarat", "Jharkhand", "Rajasthan",
+    "Madhya Pradesh", "Haryana", "Himachal Pradesh"
+]
+
+
+# Function to turn the interval counts into a two-column table
+def time_interval_table(time_interval_counts):
+    time_interval_counts_df = time_interval_counts.reset_index()
+    time_interval_counts_df.columns = ['Time Interval', 'Count']
+    return time_interval_counts_df
+
+
+# Most participants listed in the PDF report; the full table is in the
+# participant export (exports.export_results)
+PDF_MAX_ROWS = 500
+
+
+# Function to create the PDF report in memory; returns its bytes
+def create_pdf(state_counts, time_interval_counts_df, aggregated_data_df, other_states_df, graph_png,
+               max_rows=PDF_MAX_ROWS):
+    with stage('pdf_export', rows_in=len(aggregated_data_df)):
+        return _create_pdf(state_counts, time_interval_counts_df, aggregated_data_df, other_states_df, graph_png,
+                           max_rows)
+
+
+# Function to create the report document; every page gets a 'Page n of N' footer
+def _report_document():
+    from fpdf import FPDF
+
+    class ReportPDF(FPDF):
+        def footer(self):
+            self.set_y(-15)
+            self.set_font("Helvetica", size=8)
+            self.cell(0, 10, text=f"Page {self.page_no()} of {{nb}}", align='C')
+
+    return ReportPDF()
+
+
+# Function to add a titled table. fpdf2 lays the rows out as one table,
+# breaking pages where needed and repeating the headings on each page.
+def _pdf_table(pdf, title, headings, rows, col_widths=None):
+    pdf.ln(10)
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(200, 10, text=title, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", size=10)
+    with pdf.table(col_widths=col_widths, line_height=7) as table:
+        table.row(headings)
+        for row in rows:
+            table.row([str(value) for value in row])
+
+
+def _create_pdf(state_counts, time_interval_counts_df, aggregated_data_df, other_states_df, graph_png,
+                max_rows=PDF_MAX_ROWS):
+    pdf = _report_document()
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", size=12)
+
+    pdf.cell(200, 10, text="Data Analysis Report", new_x="LMARGIN", new_y="NEXT", align='C')
+
+    _pdf_table(pdf, "State Counts", ["State", "Count"], state_counts.items())
+    _pdf_table(pdf, "Other States", ["State", "Count"],
+               zip(other_states_df['State'].tolist(), other_states_df['Count'].tolist()))
+    _pdf_table(pdf, "Time Interval Counts", ["Time Interval", "Count"],
+               zip(time_interval_counts_df['Time Interval'].tolist(), time_interval_counts_df['Count'].tolist()))
+
+    pdf.add_page()
+    pdf.image(io.BytesIO(graph_png), 50, 50, 110)
+
+    if len(aggregated_data_df):
+        # Only the participants with the most time spent, up to max_rows
+        top = aggregated_data_df.nlargest(max_rows, 'Total Time Spend')
+        pdf.add_page()
+        _pdf_table(pdf, "Participants by Time Spent", ["Unique IP Add", "Total Time Spend (mins)"],
+                   zip(top['Unique IP Add'].astype(str).tolist(),
+                       (f'{minutes:.1f}' for minutes in top['Total Time Spend'].tolist())))
+        if len(top) < len(aggregated_data_df):
+            pdf.set_font("Helvetica", size=10)
+            pdf.cell(200, 10, text=f"Showing {len(top):,} of {len(aggregated_data_df):,} participants; "
+                                   f"export the participant results for the full table.", new_x="LMARGIN", new_y="NEXT")
+
+    return bytes(pdf.output())
+
+
+# Function to create the attendance XLSX in memory; returns its bytes.
+# session fills in the Language/Week/Session/Date columns (see
+# SessionStore.add_session); cumulative adds the programme's running total
+# per state, and weekly a sheet with the per-week rollup.
+def create_csv(state_counts, session=None, cumulative=None, weekly=None):
+    with stage('xlsx_export', rows_in=len(state_counts)):
+        return _create_csv(state_counts, session, cumulative, weekly)
+
+
+def _create_csv(state_counts, session=None, cumulative=None, weekly=None):
+    session = session or {}
+    # Create the DataFrame
+    csv_data = pd.DataFrame({
+        "State": STATE_ORDER,
+        "Language": session.get('medium', '').replace(' Medium', ''),
+        "Week": session.get('week', ''),
+        "Session No.": session.get('session_no', ''),
+        "Session Name": session.get('session_name', ''),
+        "Date": session.get('date', ''),
+        "KGBVS who attended": [state_counts.get(state, 0) for state in STATE_ORDER]  # Populate attendance counts
+    })
+    if cumulative is not None:
+        csv_data["Total KGBVS who attended"] = [int(cumulative.get(state, 0)) for state in STATE_ORDER]
+
+    buffer = io.BytesIO()
+    if weekly is None:
+        csv_data.to_excel(buffer, index=False)
+    else:
+        # Weeks as rows, states as columns
+        weekly_table = weekly.pivot_table(index='Week', columns='State', values='KGBVS who attended',
+                                          aggfunc='sum', fill_value=0)
+        weekly_table = weekly_table.reindex(columns=STATE_ORDER, fill_value=0).reset_index()
+        with pd.ExcelWriter(buffer) as writer:
+            csv_data.to_excel(writer, sheet_name='Attendance', index=False)
+            weekly_table.to_excel(writer, sheet_name='Weekly', index=False)
+    return buffer.getvalue()
@@ -0,0 +1,145 @@
+import io
+import itertools
+import re
+
+import pandas as pd
+
+from instrumentation import stage
+
+# Internal column names used by the analysis, by role:
+# meeting identifier, participant IP, join time and free text with the leave time
+COLUMNS = ['Meeting ID', 'Department', 'Phone', 'VoIP']
+
+# Headers seen for each column across export versions (compared lower-cased)
+HEADER_ALIASES = {
+    'Meeting ID': ['meeting id', 'meeting_id', 'meetingid', 'meeting', 'session id'],
+    'Department': ['department', 'ip', 'ip address', 'ip_address', 'ip add', 'participant ip'],
+    'Phone': ['phone', 'join time', 'joined at', 'joined', 'join'],
+    'VoIP': ['voip', 'leave time', 'left at', 'left', 'leave', 'status'],
+}
+
+SAMPLE_ROWS = 500
+# Share of non-empty sampled cells that must match for a column to qualify
+MIN_MATCH = 0.5
+
+_IPV4 = r'\s*\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\s*'
+_TIME_OF_DAY = r'\s*\d{1,2}:\d{2}:\d{2}\s*(?:[AaPp][Mm])?\s*'
+_LEAVE_TIME = r'\d{2}:\d{2}:\d{2} [APM]{2}'
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _match_share(values, pattern, full):
+    values = values.dropna().astype(str)
+    values = values[values.str.strip() != '']
+    if not len(values):
+        return 0.0
+    matches = values.str.fullmatch(pattern) if full else values.str.contains(pattern, regex=True)
+    return float(matches.mean())
+
+
+def _alias_rank(column, target):
+    name = re.sub(r'\s+', ' ', str(column)).strip().lower()
+    aliases = HEADER_ALIASES[target]
+    return aliases.index(name) if name in aliases else len(aliases)
+
+
+# Function to pick the best column for a role among those whose content
+# qualifies: a known header wins, then the highest match share, then the
+# left-most column
+def _pick(shares, target, taken):
+    candidates = [(column, share) for column, share in shares.items() if column not in taken and share >= MIN_MATCH]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda item: (_alias_rank(item[0], target), -item[1]))[0]
+
+
+# Function to work out which columns of an export hold the meeting ID, the
+# IP, the join time and the leave-time text, from a sample of its rows.
+# Returns {internal name: column in the file}; raises SchemaError when a
+# role can't be found.
+def detect_schema(sample):
+    with stage('schema', rows_in=len(sample)):
+        sample = sample.head(SAMPLE_ROWS)
+        mapping = {}
+        taken = set()
+
+        ip_shares = {column: _match_share(sample[column], _IPV4, full=True) for column in sample.columns}
+        mapping['Department'] = _pick(ip_shares, 'Department', taken)
+        taken.add(mapping['Department'])
+
+        join_shares = {column: _match_share(sample[column], _TIME_OF_DAY, full=True) for column in sample.columns}
+        mapping['Phone'] = _pick(join_shares, 'Phone', taken)
+        taken.add(mapping['Phone'])
+
+        leave_shares = {column: _match_share(sample[column], _LEAVE_TIME, full=False) for column in sample.columns}
+        mapping['VoIP'] = _pick(leave_shares, 'VoIP', taken)
+        taken.add(mapping['VoIP'])
+
+        # Meeting IDs have no fixed format, so only the header can identify them
+        meeting = [column for column in sample.columns
+                   if column not in taken and _alias_rank(column, 'Meeting ID') < len(HEADER_ALIASES['Meeting ID'])]
+        mapping['Meeting ID'] = min(meeting, key=lambda column: _alias_rank(column, 'Meeting ID')) if meeting else None
+
+        missing = [name for name in COLUMNS if mapping[name] is None]
+        if missing:
+            described = {
+                'Meeting ID': 'a meeting ID column',
+                'Department': 'a column of IP addresses',
+                'Phone': "a column of join times ('13:05:09' or '1:05:09 PM')",
+                'VoIP': "a column with leave times ('... 02:15:07 PM')",
+            }
+            raise SchemaError(
+                f"Couldn't find {', '.join(described[name] for name in missing)} in the uploaded file "
+                f"(columns: {', '.join(map(str, sample.columns))})."
+            )
+        return {name: mapping[name] for name in COLUMNS}
+
+
+# Function to read the header and first rows of an export as text
+def read_sample(file, file_name, rows=SAMPLE_ROWS):
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    position = file.tell() if hasattr(file, 'tell') else None
+    try:
+        if file_name.lower().endswith('.xlsx'):
+            return _read_xlsx_sample(file, rows)
+        return pd.read_csv(file, nrows=rows, dtype=str)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    finally:
+        if position is not None:
+            file.seek(position)
+
+
+def _read_xlsx_sample(file, rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        values = workbook.active.iter_rows(values_only=True)
+        header = next(values, None)
+        if header is None:
+            return pd.DataFrame()
+        header = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        body = [list(row[:len(header)]) + [None] * (len(header) - len(row)) for row in itertools.islice(values, rows)]
+        frame = pd.DataFrame(body, columns=header, dtype=object)
+        return frame.where(frame.isna(), frame.astype(str))
+    finally:
+        workbook.close()
+
+
+# Function to detect the column mapping of an export file or its bytes
+def detect_file_schema(file, file_name):
+    sample = read_sample(file, file_name)
+    if sample.empty and not len(sample.columns):
+        raise SchemaError("The uploaded file is empty.")
+    return detect_schema(sample)
+
+
+# Function to rename a frame's detected columns to the internal names and
+# drop everything else
+def apply_schema(frame, mapping):
+    return frame[[mapping[name] for name in COLUMNS]].set_axis(COLUMNS, axis=1)
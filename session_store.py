@@ -0,0 +1,161 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+SESSION_STORE_PATH = os.environ.get('SESSION_STORE_DB', 'sessions.sqlite3')
+
+_SCHEMA = [
+    # One row per analysed session; session_id is the upload's content hash
+    'CREATE TABLE IF NOT EXISTS sessions ('
+    'session_id TEXT PRIMARY KEY, programme TEXT NOT NULL, medium TEXT NOT NULL, session_no INTEGER NOT NULL, '
+    'session_name TEXT NOT NULL, session_date TEXT NOT NULL, week TEXT NOT NULL, participants INTEGER NOT NULL, '
+    'added_at REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS sessions_programme ON sessions (programme, session_date)',
+    # Per-session aggregates
+    'CREATE TABLE IF NOT EXISTS session_states ('
+    'session_id TEXT NOT NULL, state TEXT NOT NULL, attended INTEGER NOT NULL, PRIMARY KEY (session_id, state))',
+    'CREATE TABLE IF NOT EXISTS session_ips ('
+    'session_id TEXT NOT NULL, ip TEXT NOT NULL, minutes REAL NOT NULL, PRIMARY KEY (session_id, ip))',
+    # Rollups, updated in the same transaction as each new session
+    'CREATE TABLE IF NOT EXISTS weekly_states ('
+    'programme TEXT NOT NULL, week TEXT NOT NULL, state TEXT NOT NULL, attended INTEGER NOT NULL, '
+    'sessions INTEGER NOT NULL, PRIMARY KEY (programme, week, state))',
+    'CREATE TABLE IF NOT EXISTS programme_states ('
+    'programme TEXT NOT NULL, state TEXT NOT NULL, attended INTEGER NOT NULL, '
+    'sessions INTEGER NOT NULL, PRIMARY KEY (programme, state))',
+]
+
+
+# Function to label the ISO week a session falls in, e.g. '2024-W07'
+def week_of(session_date):
+    year, week, _ = session_date.isocalendar()
+    return f'{year}-W{week:02d}'
+
+
+# Local store of per-session attendance aggregates, with weekly and
+# cumulative per-state rollups maintained as sessions are added
+class SessionStore:
+    def __init__(self, path=SESSION_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    # Function to append one analysed session. state_counts is the per-state
+    # attendance over every state (not only the selected medium's), and
+    # aggregated_data the per-IP time totals of the upload.
+    # A session that is already stored is left as it is; returns the stored
+    # session's details either way.
+    def add_session(self, session_id, state_counts, aggregated_data, session_date, programme='', medium='',
+                    session_no=None, session_name=''):
+        if isinstance(session_date, str):
+            session_date = datetime.date.fromisoformat(session_date)
+        week = week_of(session_date)
+        attended = [(str(state), int(count)) for state, count in state_counts.items() if count]
+        ips = list(zip(aggregated_data['Unique IP Add'].astype(str),
+                       aggregated_data['Total Time Spend'].astype(float)))
+
+        with self._lock:
+            existing = self._get_session(session_id)
+            if existing is not None:
+                return existing
+            with self._db:
+                if session_no is None:
+                    (session_no,) = self._db.execute(
+                        'SELECT COALESCE(MAX(session_no), 0) + 1 FROM sessions WHERE programme = ?', (programme,)
+                    ).fetchone()
+                self._db.execute(
+                    'INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (session_id, programme, medium, int(session_no), session_name, session_date.isoformat(),
+                     week, len(ips), time.time()),
+                )
+                self._db.executemany('INSERT INTO session_states VALUES (?, ?, ?)',
+                                     [(session_id, state, count) for state, count in attended])
+                self._db.executemany('INSERT INTO session_ips VALUES (?, ?, ?)',
+                                     [(session_id, ip, minutes) for ip, minutes in ips])
+                self._db.executemany(
+                    'INSERT INTO weekly_states VALUES (?, ?, ?, ?, 1) ON CONFLICT (programme, week, state) '
+                    'DO UPDATE SET attended = attended + excluded.attended, sessions = sessions + 1',
+                    [(programme, week, state, count) for state, count in attended],
+                )
+                self._db.executemany(
+                    'INSERT INTO programme_states VALUES (?, ?, ?, 1) ON CONFLICT (programme, state) '
+                    'DO UPDATE SET attended = attended + excluded.attended, sessions = sessions + 1',
+                    [(programme, state, count) for state, count in attended],
+                )
+            return self._get_session(session_id)
+
+    # Stored details of a session, or None if it hasn't been added
+    def get_session(self, session_id):
+        with self._lock:
+            return self._get_session(session_id)
+
+    def _get_session(self, session_id):
+        row = self._db.execute(
+            'SELECT session_id, programme, medium, session_no, session_name, session_date, week, participants '
+            'FROM sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ['session_id', 'programme', 'medium', 'session_no', 'session_name', 'date', 'week', 'participants']
+        return dict(zip(keys, row))
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    # Sessions of a programme in date order
+    def sessions(self, programme=''):
+        return self._query(
+            'SELECT session_no AS "Session No.", session_name AS "Session Name", session_date AS "Date", '
+            'week AS "Week", medium AS "Medium", participants AS "Participants" '
+            'FROM sessions WHERE programme = ? ORDER BY session_date, session_no', (programme,)
+        )
+
+    # Per-week, per-state attendance, from the weekly rollup
+    def weekly_attendance(self, programme=''):
+        return self._query(
+            'SELECT week AS "Week", state AS "State", attended AS "KGBVS who attended", sessions AS "Sessions" '
+            'FROM weekly_states WHERE programme = ? ORDER BY week, state', (programme,)
+        )
+
+    # Per-state attendance over every session of a programme, from the cumulative rollup
+    def cumulative_attendance(self, programme=''):
+        counts = self._query(
+            'SELECT state, attended FROM programme_states WHERE programme = ?', (programme,)
+        )
+        return pd.Series(counts['attended'].to_numpy(dtype='int64'), index=counts['state'].astype(object),
+                         name='attended')
+
+    # Changes whenever a session is added to the programme, so anything
+    # built from its history can be keyed on it
+    def revision(self, programme=''):
+        with self._lock:
+            return self._db.execute(
+                'SELECT COUNT(*), COALESCE(MAX(added_at), 0) FROM sessions WHERE programme = ?', (programme,)
+            ).fetchone()
+
+    def programmes(self):
+        return self._query('SELECT DISTINCT programme FROM sessions ORDER BY programme')['programme'].tolist()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+# Function to get the process-wide session store
+def get_session_store():
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = SessionStore()
+        return _shared_store
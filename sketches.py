@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import histogram
+
+# 2**14 registers: 16 KB per sketch, about 0.8% standard error
+HLL_PRECISION = 14
+
+# Time spent is kept in one-minute bins up to two days (sessions can run
+# past midnight), then one open-ended bin
+MINUTE_EDGES = np.append(np.arange(0, 2 * 24 * 60 + 1, dtype=np.float64), np.inf)
+
+
+# Function to hash a column to uint64 the same way in every process, so
+# sketches built by different workers can be merged. Values hashed with
+# different salts count as different values.
+def hash_values(values, salt=''):
+    text = pd.Series(values, dtype='object').astype(str)
+    if salt:
+        text = f'{salt}\x1f' + text
+    return pd.util.hash_array(text.to_numpy(dtype=object))
+
+
+# HyperLogLog distinct-count sketch over 64-bit hashes; mergeable, fixed size
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        if registers is None:
+            registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.registers = registers
+
+    def add_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return self
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Position of the leftmost 1 in the remaining bits; frexp is exact
+        # here because they fit in a float64 mantissa
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (rest_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def add(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Can't merge HyperLogLog sketches of different precision.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+    # Relative standard error of count()
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+# Histogram over fixed bins; mergeable by adding counts, and re-binnable
+# into any coarser set of edges
+class FixedHistogram:
+    def __init__(self, edges=MINUTE_EDGES, counts=None):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        if counts is None:
+            counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.counts = counts
+
+    def add(self, values):
+        self.counts += histogram(values, self.edges)
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Can't merge histograms with different bins.")
+        self.counts += other.counts
+        return self
+
+    # Function to total the counts into [edge, next edge) bins. Returns the
+    # counts and, per bin, how many of them may belong to a neighbouring
+    # bin because an edge falls inside one of the fixed bins (0 when the
+    # edges line up with the fixed ones).
+    def rebin(self, bin_edges):
+        bin_edges = np.asarray(bin_edges, dtype=np.float64)
+        n_bins = len(bin_edges) - 1
+        lower = self.edges[:-1]
+        bins = np.searchsorted(bin_edges, lower, side='right') - 1
+        inside = (bins >= 0) & (bins < n_bins)
+        counts = np.bincount(bins[inside], weights=self.counts[inside], minlength=n_bins).astype(np.int64)
+
+        uncertain = np.zeros(n_bins, dtype=np.int64)
+        for k, edge in enumerate(bin_edges):
+            fixed = np.searchsorted(self.edges, edge, side='right') - 1
+            if 0 <= fixed < len(self.counts) and self.edges[fixed] != edge:
+                for neighbour in (k - 1, k):
+                    if 0 <= neighbour < n_bins:
+                        uncertain[neighbour] += self.counts[fixed]
+        return counts, uncertain
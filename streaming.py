@@ -0,0 +1,223 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import merge_intervals, session_spans
+from analysis import bin_time_spent, category_counts, locate_meetings, session_durations, summarize_states
+from instrumentation import stage
+from schema import COLUMNS, apply_schema, detect_file_schema
+
+CHUNK_SIZE = 100_000
+
+
+# Function to read a CSV export in chunks (the running row index is kept)
+def iter_csv_chunks(file, chunksize=CHUNK_SIZE, mapping=None):
+    mapping = mapping or detect_file_schema(file, 'export.csv')
+    usecols = list(mapping.values())
+    for chunk in pd.read_csv(file, usecols=usecols, dtype=str, chunksize=chunksize):
+        yield apply_schema(chunk, mapping)
+
+
+# Function to read an XLSX export in chunks through openpyxl's read-only row iterator
+def iter_xlsx_chunks(file, chunksize=CHUNK_SIZE, mapping=None):
+    from openpyxl import load_workbook
+
+    mapping = mapping or detect_file_schema(file, 'export.xlsx')
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(name) if name is not None else f'Unnamed: {i}' for i, name in enumerate(header)]
+        keep = [header.index(mapping[name]) for name in COLUMNS]
+
+        start = 0
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) == chunksize:
+                yield pd.DataFrame(batch, columns=COLUMNS, index=pd.RangeIndex(start, start + len(batch)))
+                start += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=COLUMNS, index=pd.RangeIndex(start, start + len(batch)))
+    finally:
+        workbook.close()
+
+
+# Function to compute state counts and per-IP time totals chunk by chunk;
+# only the per-state counts, the meetings seen so far and the per-IP span
+# carry (see SpanCarry) are kept between chunks. progress(rows) is called
+# after every chunk.
+def stream_totals(chunks, online_lookup=True, progress=None):
+    with stage('stream') as record:
+        state_counts, aggregated_data = _stream_totals(chunks, online_lookup, record, progress)
+        record['rows_out'] = len(aggregated_data)
+    return state_counts, aggregated_data
+
+
+# Per-IP time covered by the sessions seen so far. Each IP keeps a compacted
+# list of disjoint spans; a chunk only re-merges the spans of the IPs it
+# contains. Spans that end before the earliest join time of the current
+# chunk are folded: their time is added to the IP's total and the spans are
+# set aside in compact int32 arrays that are never re-merged, so for an
+# export in join-time order (as meeting platforms write them) each chunk
+# only merges the sessions still open. A later session that overlaps the
+# range of an IP's folded spans (one out of join-time order) brings them
+# back to be merged again, so the totals are exact in any order.
+class SpanCarry:
+    def __init__(self):
+        self.ip_codes = {}
+        # Folded time per IP, and the range [low, high) its folded spans lie in
+        self.folded = np.zeros(0, dtype=np.int64)
+        self.low = np.zeros(0, dtype=np.int64)
+        self.high = np.zeros(0, dtype=np.int64)
+        self.codes = np.empty(0, dtype=np.int64)
+        self.starts = np.empty(0, dtype=np.int64)
+        self.ends = np.empty(0, dtype=np.int64)
+        # Folded spans as (codes, starts, ends) blocks, one per chunk
+        self.set_aside = []
+        self.late = 0
+        self.peak_spans = 0
+
+    # Function to map a chunk's IP names to stable codes
+    def _codes_for(self, names):
+        ip_codes = self.ip_codes
+        codes = np.fromiter((ip_codes.setdefault(name, len(ip_codes)) for name in names),
+                            dtype=np.int64, count=len(names))
+        grow = len(ip_codes) - len(self.folded)
+        if grow > 0:
+            self.folded = np.concatenate([self.folded, np.zeros(grow, dtype=np.int64)])
+            self.low = np.concatenate([self.low, np.full(grow, np.iinfo(np.int64).max)])
+            self.high = np.concatenate([self.high, np.zeros(grow, dtype=np.int64)])
+        return codes
+
+    # Function to move the folded spans of the given IPs back among the open ones
+    def _unfold(self, ips):
+        codes, starts, ends = (np.concatenate(parts).astype(np.int64) for parts in zip(*self.set_aside))
+        back = np.isin(codes, ips)
+        self.set_aside = [(codes[~back].astype(np.int32), starts[~back].astype(np.int32),
+                           ends[~back].astype(np.int32))]
+        self.codes = np.concatenate([self.codes, codes[back]])
+        self.starts = np.concatenate([self.starts, starts[back]])
+        self.ends = np.concatenate([self.ends, ends[back]])
+        self.folded[ips] = 0
+        self.low[ips] = np.iinfo(np.int64).max
+        self.high[ips] = 0
+
+    # Function to add one chunk's sessions; ip_names are the chunk's IPs and
+    # ip_of_span the position of each span's IP among them
+    def add(self, ip_names, ip_of_span, starts, ends):
+        codes = self._codes_for(ip_names)[ip_of_span]
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        if not len(codes):
+            return
+        watermark = int(starts.min())
+
+        late = (starts < self.high[codes]) & (ends > self.low[codes])
+        if late.any():
+            self.late += int(np.count_nonzero(late))
+            self._unfold(np.unique(codes[late]))
+
+        # Only the carried spans of this chunk's IPs take part in the merge
+        in_chunk = np.zeros(len(self.folded), dtype=bool)
+        in_chunk[codes] = True
+        touched = in_chunk[self.codes]
+        merged = merge_intervals(np.concatenate([self.codes[touched], codes]),
+                                 np.concatenate([self.starts[touched], starts]),
+                                 np.concatenate([self.ends[touched], ends]))
+        codes, starts, ends = (np.concatenate([carried[~touched], new])
+                               for carried, new in zip((self.codes, self.starts, self.ends), merged))
+        self.peak_spans = max(self.peak_spans, len(codes))
+
+        # In join-time order every later session starts at or after the
+        # watermark, so spans ending by then won't be merged with anything
+        # again; one that is anyway comes back through _unfold
+        done = ends <= watermark
+        if done.any():
+            np.add.at(self.folded, codes[done], ends[done] - starts[done])
+            np.minimum.at(self.low, codes[done], starts[done])
+            np.maximum.at(self.high, codes[done], ends[done])
+            self.set_aside.append((codes[done].astype(np.int32), starts[done].astype(np.int32),
+                                   ends[done].astype(np.int32)))
+        self.codes, self.starts, self.ends = codes[~done], starts[~done], ends[~done]
+
+    # Function to total the covered minutes per IP, for every IP seen
+    def minutes(self):
+        seconds = self.folded + np.bincount(self.codes, weights=self.ends - self.starts,
+                                            minlength=len(self.folded)).astype(np.int64)
+        return pd.Series(seconds / 60, index=pd.Index(list(self.ip_codes), dtype=object))
+
+
+def _stream_totals(chunks, online_lookup, record, progress=None):
+    rows = 0
+    seen_meetings = set()
+    state_counts = None
+    spans = SpanCarry()
+
+    for chunk in chunks:
+        rows += len(chunk)
+
+        # A meeting belongs to the state of the first row it appears on. The
+        # seen set is probed row by row: isin would rebuild a lookup table
+        # of every meeting seen so far on each chunk.
+        meeting_ids = chunk['Meeting ID'].to_numpy(dtype=object, copy=True)
+        meeting_ids[pd.isna(meeting_ids)] = None
+        is_new = np.fromiter((meeting not in seen_meetings for meeting in meeting_ids), dtype=bool,
+                             count=len(meeting_ids))
+        new_meetings = chunk[is_new]
+        if len(new_meetings):
+            located = locate_meetings(new_meetings, online_lookup)
+            seen_meetings.update(meeting_ids[is_new])
+            chunk_counts = category_counts(located['State'])
+            state_counts = chunk_counts if state_counts is None else state_counts.add(chunk_counts, fill_value=0)
+
+        sessions = session_durations(chunk)
+        ips = sessions['Department'].cat.remove_unused_categories()
+        codes = ips.cat.codes.to_numpy()
+        starts, ends, valid = session_spans(sessions['Phone'], sessions['Extracted Time'])
+        valid &= codes >= 0
+        # A re-join that overlaps a session from an earlier chunk is still counted once
+        spans.add(ips.cat.categories.to_numpy(dtype=object), codes[valid], starts[valid], ends[valid])
+        if progress is not None:
+            progress(rows)
+
+    if state_counts is None:
+        raise ValueError("The uploaded file is empty.")
+
+    record['rows_in'] = rows
+    record['carried_spans'] = spans.peak_spans
+    record['late_sessions'] = spans.late
+    record['folded_spans'] = sum(len(codes) for codes, _, _ in spans.set_aside)
+    state_counts = state_counts.astype('int64').sort_values(ascending=False, kind='stable')
+    time_totals = spans.minutes()
+    time_totals = time_totals.reindex(sorted(time_totals.index), fill_value=0)
+    aggregated_data = pd.DataFrame({
+        'Unique IP Add': pd.Categorical(time_totals.index),
+        'Total Time Spend': time_totals.to_numpy(dtype='float32'),
+    })
+    return state_counts, aggregated_data
+
+
+# Function to process an export chunk by chunk with the same outputs as process_data
+def process_stream(chunks, medium, online_lookup=True):
+    state_counts, aggregated_data = stream_totals(chunks, online_lookup)
+    time_interval_counts = bin_time_spent(aggregated_data)
+    filtered_state_counts, other_states_df = summarize_states(state_counts, medium)
+    return time_interval_counts, filtered_state_counts, aggregated_data, other_states_df
+
+
+# Function to read an uploaded .csv or .xlsx file in chunks. The column
+# roles are detected here, so a file without them fails before any chunk
+# is processed.
+def iter_file_chunks(file, file_name, chunksize=CHUNK_SIZE):
+    mapping = detect_file_schema(file, file_name)
+    if file_name.lower().endswith('.xlsx'):
+        return iter_xlsx_chunks(file, chunksize, mapping)
+    return iter_csv_chunks(file, chunksize, mapping)
+
+
+# Function to stream an uploaded .csv or .xlsx file
+def process_file_streaming(file, file_name, medium, online_lookup=True, chunksize=CHUNK_SIZE):
+    return process_stream(iter_file_chunks(file, file_name, chunksize), medium, online_lookup)
@@ -0,0 +1,105 @@
+import io
+import os
+import time
+
+import pytest
+import streamlit as st
+
+import approximate
+import geolocation
+
+# AppTest first shipped in Streamlit 1.28; requirements.txt pins an older release
+AppTest = pytest.importorskip('streamlit.testing.v1', reason='needs Streamlit 1.28 or later').AppTest
+
+RANGES = ('start_ip,end_ip,region\n10.0.0.0,10.0.255.255,Gujarat\n10.1.0.0,10.1.255.255,Rajasthan\n'
+          '10.2.0.0,10.2.255.255,Telangana\n')
+
+# Meetings 1-4 are in Gujarat, 5-6 in Rajasthan and 7 in Telangana
+# (located from each meeting's first row)
+EXPORT = '\n'.join(['Meeting ID,Department,Phone,VoIP'] + [
+    f'{meeting},10.{region}.0.{ip},10:{ip:02d}:00 AM,Left the meeting at 11:{ip:02d}:00 AM (reason)'
+    for meeting, region in ((1, 0), (2, 0), (3, 0), (4, 0), (5, 1), (6, 1), (7, 2))
+    for ip in (meeting, meeting + 10)
+]) + '\n'
+
+EXACT_MEETINGS = {'Gujarat': 4, 'Rajasthan': 2}
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+
+class Upload(io.BytesIO):
+    name = 'export.csv'
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ranges = tmp_path / 'ranges.csv'
+    ranges.write_text(RANGES)
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(ranges))
+    monkeypatch.setattr(st, 'file_uploader', lambda *args, **kwargs: Upload(EXPORT.encode()))
+    # Estimates off by one meeting per state, so results that leaked
+    # between modes would show
+    state_table = approximate.AttendanceSketch.state_table
+    monkeypatch.setattr(approximate.AttendanceSketch, 'state_table',
+                        lambda self: state_table(self).assign(Meetings=lambda table: table['Meetings'] + 1))
+
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=60)
+    at.run()
+    for checkbox in at.checkbox:
+        if checkbox.label.startswith('Look up'):
+            checkbox.uncheck()
+    return at
+
+
+def set_mode(at, approximate_mode):
+    for checkbox in at.checkbox:
+        if checkbox.label.startswith('Approximate mode'):
+            checkbox.set_value(approximate_mode)
+    return wait_for_jobs(at)
+
+
+# Function to rerun until every background job has finished
+def wait_for_jobs(at):
+    at.run()
+    deadline = time.time() + 60
+    while any(button.label.startswith('Cancel') for button in at.button) and time.time() < deadline:
+        time.sleep(0.2)
+        at.run()
+    assert not at.exception
+    return at
+
+
+def meetings_table(at):
+    return at.dataframe[0].value
+
+
+def test_switching_modes_keeps_each_modes_state_counts(app):
+    approximate_table = meetings_table(set_mode(app, True))
+    assert approximate_table['Meetings'].to_dict() == {state: count + 1 for state, count in EXACT_MEETINGS.items()}
+
+    exact_table = meetings_table(set_mode(app, False))
+    assert exact_table['Meetings'].to_dict() == EXACT_MEETINGS
+
+    approximate_table = meetings_table(set_mode(app, True))
+    assert approximate_table['Meetings'].to_dict() == {state: count + 1 for state, count in EXACT_MEETINGS.items()}
+
+
+def test_results_cube_is_only_built_when_asked_for(app, monkeypatch):
+    import cube
+
+    built = []
+    build_cube = cube.build_cube
+    monkeypatch.setattr(cube, 'build_cube', lambda *args: built.append(args) or build_cube(*args))
+
+    at = set_mode(app, False)
+    assert not built
+    assert not [expander for expander in at.expander if expander.label == 'Explore results']
+    # Reports and exports are offered before the cube exists
+    labels = [button.label for button in at.button]
+    assert 'Generate PDF and XLSX reports' in labels and 'Export participant results' in labels
+
+    next(button for button in at.button if button.label == 'Explore results').click()
+    at = wait_for_jobs(at)
+    assert len(built) == 1
+    assert [expander for expander in at.expander if expander.label == 'Explore results']
@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pytest
+
+import geolocation
+from approximate import AttendanceSketch
+from streaming import iter_csv_chunks
+
+RANGES = 'start_ip,end_ip,region\n10.0.0.0,10.0.255.255,Gujarat\n10.1.0.0,10.1.255.255,Rajasthan\n'
+
+# The first three rows of an export are not sessions
+PREAMBLE = [('0', '10.0.0.9', '09:00:00 AM', '')] * 3
+
+# Meeting 1 starts in Gujarat and comes back with Rajasthan IPs; 10.0.0.1
+# joins twice
+ROWS = PREAMBLE + [
+    ('1', '10.0.0.1', '10:00:00 AM', 'Left the meeting at 10:30:00 AM (reason)'),
+    ('2', '10.1.0.1', '10:00:00 AM', 'Left the meeting at 10:03:00 AM (reason)'),
+    ('1', '10.1.0.2', '10:10:00 AM', 'Left the meeting at 11:40:00 AM (reason)'),
+    ('3', '10.1.0.3', '10:20:00 AM', 'Left the meeting at 10:20:30 AM (reason)'),
+    ('1', '10.1.0.4', '10:30:00 AM', 'Left the meeting at 10:45:00 AM (reason)'),
+    ('2', '10.0.0.1', '10:40:00 AM', 'Left the meeting at 11:00:00 AM (reason)'),
+]
+
+
+@pytest.fixture(autouse=True)
+def ip_ranges(tmp_path, monkeypatch):
+    path = tmp_path / 'ranges.csv'
+    path.write_text(RANGES)
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(path))
+
+
+def sketch_of(rows, chunksize, **kwargs):
+    lines = ['Meeting ID,Department,Phone,VoIP'] + [','.join(row) for row in rows]
+    raw = ('\n'.join(lines) + '\n').encode()
+    sketch = AttendanceSketch(**kwargs)
+    for chunk in iter_csv_chunks(io.BytesIO(raw), chunksize=chunksize):
+        sketch.add_chunk(chunk, online_lookup=False)
+    return sketch
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 100])
+def test_meetings_belong_to_their_first_rows_state(chunksize):
+    sketch = sketch_of(ROWS, chunksize)
+    table = sketch.state_table()
+    assert table['Meetings'].to_dict() == {'Gujarat': 2, 'Rajasthan': 2}
+    assert table['Participants'].to_dict() == {'Rajasthan': 4, 'Gujarat': 2}
+    assert (table['Meetings ±'] <= table['Meetings']).all()
+    assert sketch.relocated_meetings() == 0
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 100])
+def test_time_intervals_count_sessions_whatever_the_chunking(chunksize):
+    counts, uncertain = sketch_of(ROWS, chunksize).time_interval_counts()
+    # 30s, 3, 15, 20, 30 and 90 minutes
+    assert counts.tolist() == [1, 1, 1, 2, 0, 0, 1]
+    assert not uncertain.any()
+
+
+def test_meeting_dropped_from_the_carry_is_reported():
+    sketch = sketch_of(ROWS, 1, meeting_carry=1)
+    assert sketch.dropped_meetings > 0
+    # Meetings 1 and 2 come back after dropping out and are located again
+    assert sketch.state_table()['Meetings'].to_dict() == {'Gujarat': 3, 'Rajasthan': 3}
+    assert sketch.relocated_meetings() == 2
+
+
+def test_sketch_survives_serialization_and_merge():
+    sketch = sketch_of(ROWS, 2)
+    restored = AttendanceSketch.from_bytes(sketch.to_bytes())
+    assert restored.state_table().equals(sketch.state_table())
+    np.testing.assert_array_equal(restored.time_spent.counts, sketch.time_spent.counts)
+
+    merged = AttendanceSketch().merge(sketch).merge(restored)
+    assert merged.state_table()['Meetings'].to_dict() == {'Gujarat': 2, 'Rajasthan': 2}
+    assert merged.time_interval_counts()[0].sum() == 2 * 6
+
+
+def test_salted_meetings_count_once_per_export_when_merged():
+    first, second = sketch_of(ROWS, 100, salt='a.csv'), sketch_of(ROWS, 100, salt='b.csv')
+    merged = AttendanceSketch().merge(first).merge(second)
+    assert merged.state_table()['Meetings'].to_dict() == {'Gujarat': 4, 'Rajasthan': 4}
+    # Participants are still distinct IPs across exports
+    assert merged.state_table()['Participants'].to_dict() == {'Rajasthan': 4, 'Gujarat': 2}
+
+    unsalted = AttendanceSketch().merge(sketch_of(ROWS, 100)).merge(sketch_of(ROWS, 100))
+    assert unsalted.state_table()['Meetings'].to_dict() == {'Gujarat': 2, 'Rajasthan': 2}
@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import geolocation
+from exports import PARTICIPANT_COLUMNS, STATE_COLUMNS, export_results, write_parquet
+
+RANGES = 'start_ip,end_ip,region\n10.0.0.0,10.0.255.255,Gujarat\n10.1.0.0,10.1.255.255,Rajasthan\n'
+
+
+@pytest.fixture(autouse=True)
+def ip_ranges(tmp_path, monkeypatch):
+    path = tmp_path / 'ranges.csv'
+    path.write_text(RANGES)
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(path))
+
+
+def test_parquet_columns_keep_their_types_when_a_chunk_is_all_missing():
+    # The first chunk of two has no durations, so no time interval either
+    aggregated_data = pd.DataFrame({
+        'Unique IP Add': pd.Categorical(['10.0.0.1', '10.0.0.2', '10.1.0.1', '10.1.0.2']),
+        'Total Time Spend': np.array([np.nan, np.nan, 3.0, 45.0], dtype='float32'),
+    })
+    participants = io.BytesIO()
+    states = io.BytesIO()
+    export_results(aggregated_data, pd.Series({'Gujarat': 1, 'Rajasthan': 2}), 'parquet', participants, states,
+                   online_lookup=False, chunksize=2)
+
+    table = pq.read_table(io.BytesIO(participants.getvalue()))
+    assert table.num_rows == 4
+    assert str(table.schema.field('Time Interval').type) == 'string'
+    assert table.column('Time Interval').to_pylist() == [None, None, '1-5 mins', '40-60 mins']
+    assert table.column('State').to_pylist() == ['Gujarat', 'Gujarat', 'Rajasthan', 'Rajasthan']
+
+    state_table = pq.read_table(io.BytesIO(states.getvalue())).to_pandas()
+    assert state_table.columns.tolist() == STATE_COLUMNS
+    assert state_table['Meetings'].tolist() == [2, 1]
+
+
+def test_empty_parquet_export_has_the_participant_schema():
+    target = io.BytesIO()
+    assert write_parquet(iter([]), target) == 0
+    table = pq.read_table(io.BytesIO(target.getvalue()))
+    assert table.num_rows == 0
+    assert table.column_names == PARTICIPANT_COLUMNS
+    assert str(table.schema.field('Total Time Spend').type) == 'double'
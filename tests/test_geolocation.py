@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import geolocation
+from geolocation import IPRangeIndex, ip_to_int, load_ip_index, resolve_states
+
+# Range addresses can be dotted or plain integers, row by row
+RANGES = 'start_ip,end_ip,region\n10.0.0.0,10.0.255.255,Gujarat\n167837696,167903231,Rajasthan\n'
+
+
+@pytest.fixture(autouse=True)
+def ip_ranges(tmp_path, monkeypatch):
+    path = tmp_path / 'ranges.csv'
+    path.write_text(RANGES)
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(path))
+
+
+@pytest.mark.parametrize('address, value', [
+    ('0.0.0.0', 0),
+    ('10.0.0.1', 0x0A000001),
+    ('255.255.255.255', 0xFFFFFFFF),
+    ('192.168.001.010', 0xC0A8010A),
+    ('199.250.255.99', 0xC7FAFF63),
+    (' 10.0.0.1\t', 0x0A000001),
+    ('10.0.0.1        ', 0x0A000001),
+])
+def test_valid_addresses_are_parsed(address, value):
+    values, valid = ip_to_int([address])
+    assert valid.tolist() == [True]
+    assert values.tolist() == [value]
+
+
+@pytest.mark.parametrize('address', [
+    '', '1.2.3', '1.2.3.4.5', '1..2.3', '.1.2.3', '1.2.3.', '256.1.1.1', '1.2.3.260', '1.2.3.0400',
+    '123.123.123.1234', '1.2.3.4x', 'a.b.c.d', '1.2 .3.4', '1.2\x00.3.4', '١.٢.٣.٤', 'nan', None, np.nan, 12,
+])
+def test_invalid_addresses_are_rejected(address):
+    values, valid = ip_to_int([address])
+    assert valid.tolist() == [False]
+    assert values.tolist() == [0]
+
+
+def test_repeated_addresses_are_mapped_back_to_every_row():
+    values, valid = ip_to_int(['10.0.0.1', None, '10.0.0.1', 'bad', '10.0.0.2'])
+    assert valid.tolist() == [True, False, True, False, True]
+    assert values.tolist() == [0x0A000001, 0, 0x0A000001, 0, 0x0A000002]
+
+
+def test_lookup_matches_range_edges_only():
+    index = load_ip_index()
+    ips = ['9.255.255.255', '10.0.0.0', '10.0.255.255', '10.1.0.0', '10.1.255.255', '10.2.0.0', '10.0.0.256']
+    expected = [None, 'Gujarat', 'Gujarat', 'Rajasthan', 'Rajasthan', None, None]
+    assert index.lookup(ips).tolist() == expected
+    assert index.lookup(ips, distinct=True).tolist() == expected
+
+
+def test_index_skips_invalid_and_reversed_ranges():
+    frame = pd.DataFrame({
+        'start_ip': ['10.0.0.0', '10.1.0.0', 'bad'],
+        'end_ip': ['10.0.255.255', '10.0.0.0', '10.2.255.255'],
+        'region': ['Gujarat', 'Rajasthan', 'Kerala'],
+    })
+    index = IPRangeIndex.from_frame(frame)
+    assert len(index) == 1
+    assert index.lookup(['10.0.0.1', '10.1.0.1', '10.2.0.1']).tolist() == ['Gujarat', None, None]
+
+
+def test_resolve_states_calls_the_fallback_once_with_the_misses():
+    calls = []
+
+    def fallback(ips):
+        calls.append(ips)
+        return ['Kerala' if ip == '8.8.8.8' else None for ip in ips]
+
+    ips = pd.Series(['10.0.0.1', '8.8.8.8', '10.1.0.1', None, '1.1.1.1', '8.8.8.8'], index=[5, 4, 3, 2, 1, 0])
+    states = resolve_states(ips, fallback=fallback)
+    assert calls == [['8.8.8.8', '1.1.1.1']]
+    assert states.index.tolist() == [5, 4, 3, 2, 1, 0]
+    assert states.tolist() == ['Gujarat', 'Kerala', 'Rajasthan', 'Unknown', 'Unknown', 'Kerala']
+
+
+def test_resolve_states_without_a_range_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(tmp_path / 'missing.csv'))
+    states = resolve_states(pd.Series(['10.0.0.1', '10.0.0.1']).astype('category'))
+    assert states.tolist() == ['Unknown', 'Unknown']
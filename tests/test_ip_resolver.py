@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ip_resolver import BatchResolver, CircuitBreaker
+
+REGIONS = {'1.1.1.1': 'Telangana', '2.2.2.2': 'Manipur', '3.3.3.3': 'Tripura'}
+
+
+# Stub of the ipinfo API: known IPs answer with their region, 'flaky' IPs
+# fail a set number of times first, 'down' IPs always fail and 'slow' IPs
+# answer after the client has given up
+class StubServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.requests = Counter()
+        self.failures_left = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        ip_address = self.path.split('?')[0].strip('/').split('/')[0]
+        server = self.server
+        with server.lock:
+            server.requests[ip_address] += 1
+            failing = server.failures_left[ip_address] > 0
+            if failing:
+                server.failures_left[ip_address] -= 1
+        if ip_address.startswith('slow'):
+            # The client has timed out by now; there is no one to answer
+            time.sleep(1.0)
+            return
+        if failing or ip_address.startswith('down'):
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({'ip': ip_address, 'region': REGIONS.get(ip_address, 'Haryana')}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_resolver(stub, **kwargs):
+    options = {'api_key': None, 'rate_limit': 0, 'timeout': 0.5, 'max_retries': 2, 'backoff': 0.01}
+    options.update(kwargs)
+    return BatchResolver(stub.url, **options)
+
+
+def test_resolves_each_distinct_ip_once(stub):
+    resolver = make_resolver(stub)
+    ips = ['1.1.1.1', '2.2.2.2', '1.1.1.1', '3.3.3.3', '2.2.2.2', '1.1.1.1']
+    assert resolver.resolve_many(ips) == ['Telangana', 'Manipur', 'Telangana', 'Tripura', 'Manipur', 'Telangana']
+    assert stub.requests == Counter({'1.1.1.1': 1, '2.2.2.2': 1, '3.3.3.3': 1})
+    resolver.close()
+
+
+def test_retries_server_errors(stub):
+    stub.failures_left['flaky'] = 2
+    resolver = make_resolver(stub)
+    assert resolver.resolve_many(['flaky']) == ['Haryana']
+    assert stub.requests['flaky'] == 3
+    assert resolver.stats['retries'] == 2
+    resolver.close()
+
+
+def test_gives_up_after_retries(stub):
+    resolver = make_resolver(stub)
+    assert resolver.resolve_many(['down-1']) == ['Unknown']
+    assert stub.requests['down-1'] == 3
+    assert resolver.stats['failures'] == 1
+    resolver.close()
+
+
+def test_timeouts_degrade_to_unknown(stub):
+    resolver = make_resolver(stub, timeout=0.1, max_retries=0)
+    started = time.perf_counter()
+    assert resolver.resolve_many(['slow-1']) == ['Unknown']
+    assert time.perf_counter() - started < 1.0
+    resolver.close()
+
+
+def test_circuit_breaker_stops_calling_the_api(stub):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60.0)
+    resolver = make_resolver(stub, max_workers=1, max_retries=1, breaker=breaker)
+    ips = [f'down-{i}' for i in range(20)]
+    assert resolver.resolve_many(ips) == ['Unknown'] * len(ips)
+    assert breaker.is_open
+    # Only the calls before the breaker opened reached the server: both
+    # attempts for the first IP and the first for the second
+    assert sum(stub.requests.values()) == 3
+    assert resolver.stats['short_circuited'] == len(ips) - 1
+    resolver.close()
+
+
+def test_circuit_breaker_recovers_after_reset_timeout(stub):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    resolver = make_resolver(stub, max_workers=1, max_retries=0, breaker=breaker)
+    assert resolver.resolve_many(['down-1', '1.1.1.1']) == ['Unknown', 'Unknown']
+    time.sleep(0.3)
+    # One probe is let through; it succeeds, so the breaker closes again
+    assert resolver.resolve_many(['2.2.2.2', '3.3.3.3']) == ['Manipur', 'Tripura']
+    assert not breaker.is_open
+    resolver.close()
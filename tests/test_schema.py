@@ -0,0 +1,117 @@
+import datetime
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from schema import COLUMNS, MIN_MATCH, SchemaError, apply_schema, detect_file_schema, detect_schema, read_sample
+
+JOIN = ['10:00:00 AM', '14:05:09', '1:05:09 pm', '09:59:59']
+LEAVE = ['Left the meeting at 10:30:00 AM (reason)'] * 4
+
+
+def sample(**columns):
+    return pd.DataFrame(columns, dtype=object)
+
+
+def test_standard_export_maps_to_itself():
+    frame = sample(**{'Meeting ID': ['1', '1', '2', '2'], 'Department': ['10.0.0.1'] * 4, 'Phone': JOIN,
+                      'VoIP': LEAVE})
+    assert detect_schema(frame) == {name: name for name in COLUMNS}
+
+
+def test_renamed_and_reordered_columns_are_found_by_content():
+    frame = sample(**{'Leave Time': LEAVE, 'Name': ['a', 'b', 'c', 'd'], '  Join   Time ': JOIN,
+                      'Participant IP': [' 10.0.0.1 ', '10.0.0.2', '10.0.0.3', '10.0.0.4'],
+                      'Session ID': ['x', 'y', 'z', 'x']})
+    assert detect_schema(frame) == {'Meeting ID': 'Session ID', 'Department': 'Participant IP',
+                                    'Phone': '  Join   Time ', 'VoIP': 'Leave Time'}
+
+
+def test_known_header_wins_then_match_share_then_left_most():
+    ips = ['10.0.0.1'] * 4
+    mostly_ips = ['10.0.0.1'] * 3 + ['unknown']
+    base = {'Meeting ID': ['1'] * 4, 'Phone': JOIN, 'VoIP': LEAVE}
+
+    # An earlier alias beats a later one, whatever the share
+    frame = sample(**{'participant ip': ips, 'IP': mostly_ips}, **base)
+    assert detect_schema(frame)['Department'] == 'IP'
+    # Any alias beats an unknown header
+    frame = sample(**{'Host': ips, 'Participant IP': mostly_ips}, **base)
+    assert detect_schema(frame)['Department'] == 'Participant IP'
+    # Among unknown headers, the higher share, then the left-most column
+    frame = sample(**{'Host': mostly_ips, 'Client': ips, 'Origin': ips}, **base)
+    assert detect_schema(frame)['Department'] == 'Client'
+
+
+def test_columns_below_the_minimum_match_share_are_ignored():
+    assert MIN_MATCH == 0.5
+    base = {'Meeting ID': ['1'] * 4, 'Phone': JOIN, 'VoIP': LEAVE}
+    # Half of the non-empty cells qualify; blank cells aren't counted
+    frame = sample(Host=['10.0.0.1', 'n/a', '', None], **base)
+    assert detect_schema(frame)['Department'] == 'Host'
+
+    frame = sample(Host=['10.0.0.1', 'n/a', 'n/a', None], **base)
+    with pytest.raises(SchemaError, match='a column of IP addresses'):
+        detect_schema(frame)
+
+
+def test_schema_error_lists_every_missing_role_and_the_columns():
+    frame = sample(Code=['1'] * 4, Host=['10.0.0.1'] * 4, When=JOIN, Notes=['joined'] * 4)
+    with pytest.raises(SchemaError) as error:
+        detect_schema(frame)
+    assert str(error.value) == (
+        "Couldn't find a meeting ID column, a column with leave times ('... 02:15:07 PM') in the uploaded file "
+        "(columns: Code, Host, When, Notes)."
+    )
+
+
+def test_a_column_is_only_used_for_one_role():
+    # The join times also contain a leave time pattern, but are taken first
+    frame = sample(**{'Meeting ID': ['1'] * 4, 'IP': ['10.0.0.1'] * 4, 'Joined': ['10:30:00 AM'] * 4})
+    with pytest.raises(SchemaError, match='leave times'):
+        detect_schema(frame)
+
+
+def xlsx_bytes(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_xlsx_sample_is_read_as_text():
+    content = xlsx_bytes([
+        ['Meeting ID', 'IP Address', 'Join Time', 'Leave Time', None],
+        [101, '10.0.0.1', datetime.time(13, 5, 9), 'Left the meeting at 01:30:00 PM (reason)', 'extra'],
+        [102, '10.0.0.2', '1:10:00 PM'],
+        [103, '10.0.0.3', '13:20:00', 'Left the meeting at 01:40:00 PM (reason)'],
+    ])
+    frame = read_sample(content, 'export.xlsx')
+    assert frame.columns.tolist() == ['Meeting ID', 'IP Address', 'Join Time', 'Leave Time', 'Unnamed: 4']
+    assert frame['Meeting ID'].tolist() == ['101', '102', '103']
+    assert frame['Join Time'].tolist() == ['13:05:09', '1:10:00 PM', '13:20:00']
+    # Short rows are padded with missing cells
+    assert frame.iloc[1].isna().tolist() == [False, False, False, True, True]
+    assert frame.shape == (3, 5)
+
+    mapping = detect_file_schema(content, 'export.xlsx')
+    assert mapping == {'Meeting ID': 'Meeting ID', 'Department': 'IP Address', 'Phone': 'Join Time',
+                       'VoIP': 'Leave Time'}
+    assert apply_schema(frame, mapping).columns.tolist() == COLUMNS
+
+
+def test_xlsx_sample_stops_at_the_requested_rows_and_keeps_the_file_position():
+    file = io.BytesIO(xlsx_bytes([['IP']] + [[f'10.0.0.{i}'] for i in range(10)]))
+    assert len(read_sample(file, 'export.xlsx', rows=4)) == 4
+    assert file.tell() == 0
+
+
+@pytest.mark.parametrize('content, file_name', [(b'', 'export.csv'), (xlsx_bytes([]), 'export.xlsx')])
+def test_empty_files_are_reported(content, file_name):
+    with pytest.raises(SchemaError, match='empty'):
+        detect_file_schema(content, file_name)
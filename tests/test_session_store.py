@@ -0,0 +1,41 @@
+import datetime
+
+import pandas as pd
+
+from session_store import SessionStore
+
+
+def make_store(tmp_path):
+    return SessionStore(str(tmp_path / 'sessions.sqlite3'))
+
+
+def participants(*ips):
+    return pd.DataFrame({'Unique IP Add': list(ips), 'Total Time Spend': [30.0] * len(ips)})
+
+
+def test_revision_changes_when_a_session_is_added(tmp_path):
+    store = make_store(tmp_path)
+    empty = store.revision('Spoken English')
+    store.add_session('a', pd.Series({'Telangana': 3}), participants('10.0.0.1'), datetime.date(2024, 2, 12),
+                      programme='Spoken English')
+    first = store.revision('Spoken English')
+    assert first != empty
+    # Another programme's sessions leave it alone
+    store.add_session('b', pd.Series({'Telangana': 1}), participants('10.0.0.2'), datetime.date(2024, 2, 13),
+                      programme='Science')
+    assert store.revision('Spoken English') == first
+    store.add_session('c', pd.Series({'Manipur': 2}), participants('10.0.0.3'), datetime.date(2024, 2, 14),
+                      programme='Spoken English')
+    assert store.revision('Spoken English') != first
+
+
+def test_cumulative_attendance_keeps_every_state(tmp_path):
+    store = make_store(tmp_path)
+    store.add_session('a', pd.Series({'Telangana': 3, 'Gujarat': 2}), participants('10.0.0.1'),
+                      datetime.date(2024, 2, 12), programme='P', medium='English Medium')
+    store.add_session('b', pd.Series({'Telangana': 1, 'Gujarat': 4}), participants('10.0.0.2'),
+                      datetime.date(2024, 2, 19), programme='P', medium='Hindi Medium')
+    cumulative = store.cumulative_attendance('P')
+    assert cumulative.to_dict() == {'Telangana': 4, 'Gujarat': 6}
+    weekly = store.weekly_attendance('P')
+    assert weekly['Week'].tolist() == ['2024-W07', '2024-W07', '2024-W08', '2024-W08']
@@ -0,0 +1,112 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import geolocation
+import ingest
+from analysis import time_spent_per_ip
+from ingest import load_upload
+from streaming import iter_csv_chunks, stream_totals
+
+RANGES = 'start_ip,end_ip,region\n10.0.0.0,10.0.255.255,Telangana\n10.1.0.0,10.1.255.255,Andhra Pradesh\n'
+
+# The first three rows of an export are not sessions
+PREAMBLE = [('0', '10.0.0.9', '09:00:00 AM', '')] * 3
+
+# Re-joins overlap sessions from earlier chunks, and one IP comes back much later
+ROWS = PREAMBLE + [
+    ('1', '10.0.0.1', '10:00:00 AM', 'Left the meeting at 10:30:00 AM (reason)'),
+    ('1', '10.0.0.2', '10:05:00 AM', 'Left the meeting at 10:20:00 AM (reason)'),
+    ('1', '10.1.0.1', '10:10:00 AM', 'Left the meeting at 11:00:00 AM (reason)'),
+    ('2', '10.0.0.1', '10:20:00 AM', 'Left the meeting at 10:45:00 AM (reason)'),
+    ('2', '10.0.0.2', '10:25:00 AM', 'Left the meeting at 10:26:00 AM (reason)'),
+    ('2', '10.1.0.1', '10:40:00 AM', 'Left the meeting at 10:50:00 AM (reason)'),
+    ('3', '10.1.0.1', '11:00:00 AM', 'Left the meeting at 11:30:00 AM (reason)'),
+    ('3', '10.0.0.3', '11:00:00 AM', 'Left the meeting at 11:10:00 AM (reason)'),
+    ('3', '10.0.0.1', '11:05:00 AM', 'Left the meeting at 11:15:00 AM (reason)'),
+]
+
+
+@pytest.fixture(autouse=True)
+def ip_ranges(tmp_path, monkeypatch):
+    path = tmp_path / 'ranges.csv'
+    path.write_text(RANGES)
+    monkeypatch.setattr(geolocation, 'IP_RANGES_PATH', str(path))
+    monkeypatch.setattr(ingest, 'INGEST_CACHE_DIR', str(tmp_path / 'ingest_cache'))
+
+
+def to_csv(rows):
+    lines = ['Meeting ID,Department,Phone,VoIP'] + [','.join(row) for row in rows]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def totals(aggregated_data):
+    return aggregated_data.set_index(aggregated_data['Unique IP Add'].astype(str))['Total Time Spend']
+
+
+def streamed(raw, chunksize):
+    state_counts, aggregated_data = stream_totals(iter_csv_chunks(io.BytesIO(raw), chunksize=chunksize),
+                                                  online_lookup=False)
+    return state_counts, totals(aggregated_data)
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 4, 100])
+def test_stream_matches_in_memory_totals(chunksize):
+    raw = to_csv(ROWS)
+    expected = totals(time_spent_per_ip(load_upload(raw, 'export.csv')))
+    state_counts, minutes = streamed(raw, chunksize)
+    assert minutes.index.tolist() == expected.index.tolist()
+    np.testing.assert_allclose(minutes.to_numpy(), expected.to_numpy(), atol=1e-3)
+    assert state_counts.to_dict() == {'Telangana': 3, 'Andhra Pradesh': 1}
+
+
+def test_stream_is_independent_of_chunking():
+    raw = to_csv(ROWS)
+    _, whole = streamed(raw, 100)
+    for chunksize in (1, 3):
+        _, minutes = streamed(raw, chunksize)
+        pd.testing.assert_series_equal(minutes, whole)
+
+
+def session(meeting, ip, joined, left):
+    return (meeting, ip, joined, f'Left the meeting at {left} (reason)')
+
+
+def assert_streams_exactly(rows, ip, minutes_expected):
+    raw = to_csv(PREAMBLE + rows)
+    expected = totals(time_spent_per_ip(load_upload(raw, 'export.csv')))
+    assert expected[ip] == pytest.approx(minutes_expected)
+    for chunksize in (1, 2, 100):
+        _, minutes = streamed(raw, chunksize)
+        assert minutes[ip] == pytest.approx(minutes_expected), chunksize
+
+
+def test_session_in_the_gap_before_folded_time_is_counted():
+    # 10:00-10:10 is folded once the 10:20 session's chunk arrives; the
+    # 09:00 session comes later in the file, out of join-time order
+    assert_streams_exactly([
+        session('1', '10.0.0.1', '10:00:00 AM', '10:10:00 AM'),
+        session('1', '10.0.0.1', '10:20:00 AM', '10:30:00 AM'),
+        session('2', '10.0.0.1', '09:00:00 AM', '09:20:00 AM'),
+    ], '10.0.0.1', 40)
+
+
+def test_session_overlapping_folded_time_is_counted_once():
+    assert_streams_exactly([
+        session('1', '10.0.0.1', '10:00:00 AM', '10:30:00 AM'),
+        session('1', '10.0.0.2', '11:00:00 AM', '11:10:00 AM'),
+        session('2', '10.0.0.1', '10:15:00 AM', '10:40:00 AM'),
+        session('2', '10.0.0.1', '09:50:00 AM', '10:05:00 AM'),
+    ], '10.0.0.1', 50)
+
+
+def test_rejoin_after_midnight_is_counted():
+    # In join-time order; the watermark goes back to the start of the day
+    assert_streams_exactly([
+        session('1', '10.0.0.1', '10:00:00 PM', '10:30:00 PM'),
+        session('1', '10.0.0.2', '10:40:00 PM', '11:50:00 PM'),
+        session('1', '10.0.0.1', '12:10:00 AM', '12:40:00 AM'),
+        session('1', '10.0.0.2', '01:00:00 AM', '01:20:00 AM'),
+    ], '10.0.0.1', 60)
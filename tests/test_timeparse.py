@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeparse import MISSING_TIME, duration_minutes, extract_leave_time, parse_time_of_day
+
+
+def seconds(hours, minutes, secs):
+    return hours * 3600 + minutes * 60 + secs
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1:05:09 PM', seconds(13, 5, 9)),
+    ('01:05:09 PM', seconds(13, 5, 9)),
+    ('1:05:09PM', seconds(13, 5, 9)),
+    ('1:05:09 pm', seconds(13, 5, 9)),
+    ('12:00:00 AM', 0),
+    ('12:30:00 PM', seconds(12, 30, 0)),
+    ('11:59:59 PM', seconds(23, 59, 59)),
+    ('9:05:00 AM', seconds(9, 5, 0)),
+    ('13:05:09', seconds(13, 5, 9)),
+    ('7:05:09', seconds(7, 5, 9)),
+    ('00:00:00', 0),
+    ('23:59:59', seconds(23, 59, 59)),
+    ('  9:05:00 AM ', seconds(9, 5, 0)),
+])
+def test_twelve_and_twenty_four_hour_times(value, expected):
+    assert parse_time_of_day([value]).tolist() == [expected]
+
+
+@pytest.mark.parametrize('value', ['', 'garbage', '24:00:00', '13:05:09 PM', '0:05:09 AM', '10:00', None, np.nan])
+def test_unparseable_cells_are_missing(value):
+    assert parse_time_of_day([value]).tolist() == [MISSING_TIME]
+
+
+def test_mixed_column_keeps_row_order_and_repeats():
+    values = pd.Series(['1:00:00 PM', '13:00:00', None, '1:00:00 AM', '1:00:00 PM', 'bad', '01:00:00'])
+    result = parse_time_of_day(values)
+    assert result.dtype == np.int32
+    assert result.tolist() == [46800, 46800, MISSING_TIME, 3600, 46800, MISSING_TIME, 3600]
+
+
+def test_categorical_and_empty_columns():
+    values = pd.Series(['10:00:00 AM', '22:00:00', '10:00:00 AM'], dtype='category')
+    assert parse_time_of_day(values).tolist() == [36000, 79200, 36000]
+    assert parse_time_of_day(pd.Series([], dtype=object)).tolist() == []
+
+
+def test_leave_time_is_the_first_time_in_the_text():
+    values = pd.Series([
+        'Left the meeting at 02:15:07 PM (reason)',
+        'Rejoined at 11:00:00 AM, left at 11:30:00 AM',
+        '12:00:00 AM',
+        'Left at 2:15:07 PM',
+        'Still in the meeting',
+        '',
+        None,
+        np.nan,
+    ])
+    assert extract_leave_time(values).tolist() == [seconds(14, 15, 7), seconds(11, 0, 0), 0] + [MISSING_TIME] * 5
+
+
+@pytest.mark.parametrize('join, leave, minutes', [
+    ('10:00:00 AM', '10:30:00 AM', 30),
+    ('11:50:00 AM', '12:10:00 PM', 20),
+    ('12:50:00 PM', '01:10:00 PM', 20),
+    ('11:50:00 PM', '12:10:00 AM', 20),
+    ('23:00:00', '01:30:00 AM', 150),
+    ('10:00:00 AM', '10:00:30 AM', 0.5),
+    ('10:00:00 AM', '10:00:00 AM', 0),
+    # A leave time before the join time is read as the next day
+    ('10:00:00 AM', '09:59:00 AM', 24 * 60 - 1),
+])
+def test_durations_cross_noon_and_midnight(join, leave, minutes):
+    result = duration_minutes(parse_time_of_day([join]), parse_time_of_day([leave]))
+    assert result.dtype == np.float32
+    assert result.tolist() == pytest.approx([minutes])
+
+
+def test_duration_is_missing_when_either_time_is():
+    join = np.array([MISSING_TIME, 36000, MISSING_TIME, 36000], dtype=np.int32)
+    leave = np.array([37800, MISSING_TIME, MISSING_TIME, 37800], dtype=np.int32)
+    result = duration_minutes(join, leave)
+    assert np.isnan(result[:3]).all()
+    assert result[3] == 30
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+# Seconds-of-day value for cells that couldn't be parsed
+MISSING_TIME = -1
+
+_FORMATS_12H = ('%I:%M:%S %p', '%I:%M:%S%p')
+_FORMATS_24H = ('%H:%M:%S',)
+
+
+def _seconds_of_day(parsed):
+    seconds = parsed.dt.hour * 3600 + parsed.dt.minute * 60 + parsed.dt.second
+    return seconds.fillna(MISSING_TIME).to_numpy(dtype=np.int32)
+
+
+# Function to parse a column of mixed 12h ('1:05:09 PM') and 24h ('13:05:09')
+# times into int32 seconds-of-day, MISSING_TIME where a cell doesn't parse.
+# Distinct strings are parsed once, split by format and converted in bulk.
+def parse_time_of_day(values):
+    codes, uniques = pd.factorize(pd.Series(values, dtype='object').astype(str))
+    uniques = pd.Series(uniques, dtype='object').str.strip()
+    seconds = np.full(len(uniques), MISSING_TIME, dtype=np.int32)
+
+    # %p matches 'pm' as well as 'PM'
+    upper = uniques.str.upper()
+    twelve_hour = (upper.str.contains('AM', regex=False) | upper.str.contains('PM', regex=False)).to_numpy()
+    for mask, formats in ((twelve_hour, _FORMATS_12H), (~twelve_hour, _FORMATS_24H)):
+        part = uniques[mask]
+        part_seconds = np.full(len(part), MISSING_TIME, dtype=np.int32)
+        for time_format in formats:
+            todo = part_seconds == MISSING_TIME
+            if not todo.any():
+                break
+            parsed = pd.to_datetime(part[todo], format=time_format, errors='coerce')
+            part_seconds[todo] = _seconds_of_day(parsed)
+        seconds[mask] = part_seconds
+
+    # Missing cells have code -1, which picks the MISSING_TIME slot appended last
+    return np.append(seconds, np.int32(MISSING_TIME))[codes]
+
+
+# Leave times are embedded in free text, e.g. 'Left at 02:15:07 PM'
+_LEAVE_TIME_PATTERN = r'(\d{2}:\d{2}:\d{2} [APM]{2})'
+
+SECONDS_PER_DAY = 24 * 3600
+
+
+# Function to pull the first 'hh:mm:ss AM/PM' out of each text cell as
+# seconds-of-day, using one str.extract pass over the column
+def extract_leave_time(values):
+    text = pd.Series(values, dtype='object').astype(str)
+    return parse_time_of_day(text.str.extract(_LEAVE_TIME_PATTERN, expand=False))
+
+
+# Function to compute float32 minutes between join and leave seconds-of-day.
+# A leave time earlier than the join time means the session ran past
+# midnight; NaN where either side is missing.
+def duration_minutes(join_seconds, leave_seconds):
+    join_seconds = np.asarray(join_seconds, dtype=np.int32)
+    leave_seconds = np.asarray(leave_seconds, dtype=np.int32)
+    valid = (join_seconds != MISSING_TIME) & (leave_seconds != MISSING_TIME)
+    seconds = leave_seconds - join_seconds
+    seconds = np.where(seconds < 0, seconds + SECONDS_PER_DAY, seconds)
+    return np.where(valid, seconds / np.float32(60), np.nan).astype(np.float32)